@@ -7,6 +7,7 @@ from absence.service import AbsenceService
 from absence.sheets import Absence as SheetsAbsence
 from absence.sheets import AbsenceSheets
 from bossing.sheets import BossingSheets, Party
+from utils import sheets
 
 
 class Absence:
@@ -19,7 +20,7 @@ class Absence:
 
         async def on_start_absence(sheets_absence: SheetsAbsence):
             # Delete the absence event
-            self.sheets_absence.delete_absence(sheets_absence)
+            await self.sheets_absence.delete_absence(sheets_absence)
 
             # Set the Away role
             member = self.client.get_guild(config.GROVE_GUILD_ID).get_member(sheets_absence.user_id)
@@ -49,7 +50,7 @@ class Absence:
 
         async def on_end_absence(sheets_absence: SheetsAbsence):
             # Delete the absence event
-            self.sheets_absence.delete_absence(sheets_absence)
+            await self.sheets_absence.delete_absence(sheets_absence)
 
             # Clear the Away role
             member = self.client.get_guild(config.GROVE_GUILD_ID).get_member(sheets_absence.user_id)
@@ -65,8 +66,13 @@ class Absence:
     def on_ready(self):
         self._restart_service()
 
-    def on_member_remove(self, member: discord.Member):
-        deleted_sheets_absences = self.sheets_absence.delete_user_absences(member.id)
+    async def pull(self, prefetch: sheets.Prefetch = None):
+        if await self.sheets_absence.sync_data(prefetch) and self.client.is_ready():
+            # Before the bot is ready, on_ready starts the service with the latest data
+            self._restart_service()
+
+    async def on_member_remove(self, member: discord.Member):
+        deleted_sheets_absences = await self.sheets_absence.delete_user_absences(member.id)
         if len(deleted_sheets_absences) > 0:
             self._restart_service()
 
@@ -167,7 +173,7 @@ class Absence:
                                                    int(start_date.timestamp()),
                                                    int(end_date.timestamp()))
 
-                self.sheets_absence.append_absences(start_sheets_absence, end_sheets_absence)
+                await self.sheets_absence.append_absences(start_sheets_absence, end_sheets_absence)
                 self._restart_service()
 
                 await interaction.followup.send('Absence has been scheduled successfully.', ephemeral=True)
@@ -226,7 +232,7 @@ class Absence:
             await interaction.user.remove_roles(
                 self.client.get_guild(config.GROVE_GUILD_ID).get_role(config.GROVE_ROLE_ID_AWAY))
 
-        delete_sheets_absences = self.sheets_absence.delete_user_absences(interaction.user.id)
+        delete_sheets_absences = await self.sheets_absence.delete_user_absences(interaction.user.id)
         if len(delete_sheets_absences) > 0:
             await interaction.followup.send(f'Scheduled absence has been cleared.', ephemeral=True)
         else:
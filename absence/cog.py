@@ -1,7 +1,10 @@
+import functools
+
 from discord import app_commands
 from discord.ext import commands
 
 from absence.absence import Absence
+from utils import sheets
 
 absence: Absence
 
@@ -41,7 +44,7 @@ class AbsenceCog(commands.Cog):
 
     @commands.Cog.listener()
     async def on_member_remove(self, member):
-        absence.on_member_remove(member)
+        await absence.on_member_remove(member)
 
     absence_group = AbsenceGroup()
 
@@ -49,4 +52,10 @@ class AbsenceCog(commands.Cog):
 async def setup(bot):
     global absence
     absence = Absence(bot)
+    if absence.sheets_absence.load_local():
+        # Start from the last synced data, and bring it up to date without holding up startup
+        sheets.pull_in_background(functools.partial(absence.pull, bot.prefetch))
+    else:
+        await absence.sheets_absence.sync_data(bot.prefetch)
+    sheets.register_puller(absence.pull)
     await bot.add_cog(AbsenceCog(bot))
@@ -2,10 +2,8 @@ from __future__ import print_function
 
 from enum import Enum
 
-from googleapiclient.errors import HttpError
-
 import config
-from utils import sheets
+from utils import sheets, store
 
 
 class Absence:
@@ -48,33 +46,80 @@ class Absence:
 
 class AbsenceSheets:
     RANGE_ABSENCES = 'Absences!A2:E'
+    TABLE_ABSENCES = store.Table('absences')
 
     def __init__(self):
-        self.__absences = self.__get_absences()
+        self.__absences: list[Absence] = []
+        self.__loaded = False
 
     @property
     def absences(self):
         return self.__absences
 
+    async def sync_data(self, prefetch: sheets.Prefetch = None):
+        """Reads the absences from Sheets into the local store, and returns whether they changed.
+
+        The local store is used as is while local changes are waiting to be sent, or if Sheets cannot be read.
+        """
+        revision = self.TABLE_ABSENCES.revision
+        changed = False
+        if await sheets.push():
+            try:
+                absences_values = await self.__get_absences_values(prefetch)
+            except sheets.REQUEST_ERRORS as error:
+                print(f'Using the local absences, Sheets could not be read: {error}')
+            else:
+                if revision == self.TABLE_ABSENCES.revision:
+                    self.TABLE_ABSENCES.mark_synced()
+                    if absences_values != self.TABLE_ABSENCES.load():
+                        self.TABLE_ABSENCES.replace(absences_values)
+                        changed = True
+
+        if changed or not self.__loaded:
+            self.__load()
+        return changed
+
+    def load_local(self):
+        """Loads the absences from the local store, if it has been synced before. Returns whether it was loaded."""
+        if self.TABLE_ABSENCES.synced_at is None:
+            return False
+        self.__load()
+        return True
+
+    def __load(self):
+        self.__absences = list(map(lambda absences_value: Absence.from_sheets_value(absences_value),
+                                   self.TABLE_ABSENCES.load()))
+        self.__loaded = True
+
     @staticmethod
-    def __get_absences():
-        result = sheets.get_service().spreadsheets().values().get(
-            spreadsheetId=config.MEMBER_ACTIVITY_SPREADSHEET_ID,
-            range=AbsenceSheets.RANGE_ABSENCES).execute()
-        absences_values = result.get('values', [])
-        return list(map(lambda absences_value: Absence.from_sheets_value(absences_value), absences_values))
-
-    def append_absences(self, *new_sheets_absences: Absence):
+    async def __get_absences_values(prefetch: sheets.Prefetch = None):
+        batch_get = prefetch.batch_get if prefetch else sheets.batch_get
+        [absences_values] = await batch_get(config.MEMBER_ACTIVITY_SPREADSHEET_ID, [AbsenceSheets.RANGE_ABSENCES])
+        return list(map(lambda absences_value: Absence.from_sheets_value(absences_value).to_sheets_value(),
+                        absences_values))
+
+    def __save(self):
+        self.TABLE_ABSENCES.replace([sheets_absence.to_sheets_value() for sheets_absence in self.__absences])
+
+    def __queue_delete(self, delete_index: int, delete_count: int):
+        delete_body = {"requests": [{"deleteDimension": {
+            "range": {"sheetId": config.MEMBER_ACTIVITY_SHEET_ID_ABSENCES, "dimension": "ROWS",
+                      # Offset by 1 due to header row
+                      "startIndex": delete_index + 1,
+                      "endIndex": delete_index + delete_count + 1}}}]}
+        sheets.enqueue(config.MEMBER_ACTIVITY_SPREADSHEET_ID, 'spreadsheet', delete_body)
+
+    async def append_absences(self, *new_sheets_absences: Absence):
         def absence_to_sheets_values(sheets_absence: Absence):
             return sheets_absence.to_sheets_value()
 
-        body = {'values': list(map(absence_to_sheets_values, new_sheets_absences))}
-        sheets.get_service().spreadsheets().values().append(spreadsheetId=config.MEMBER_ACTIVITY_SPREADSHEET_ID,
-                                                            range=self.RANGE_ABSENCES, valueInputOption="RAW",
-                                                            body=body).execute()
+        sheets.enqueue(config.MEMBER_ACTIVITY_SPREADSHEET_ID, 'append',
+                       {'range': self.RANGE_ABSENCES, 'valueInputOption': 'RAW',
+                        'values': list(map(absence_to_sheets_values, new_sheets_absences))})
         self.__absences += new_sheets_absences
+        self.__save()
 
-    def delete_absence(self, delete_sheets_absences: Absence):
+    async def delete_absence(self, delete_sheets_absences: Absence):
         delete_index = 0
         for sheets_absence in self.__absences:
             if sheets_absence.user_id == delete_sheets_absences.user_id:
@@ -86,28 +131,18 @@ class AbsenceSheets:
             # Cannot find delete_member in sheets_members_list
             return
 
-        delete_body = {"requests": [{"deleteDimension": {
-            "range": {"sheetId": config.MEMBER_ACTIVITY_SHEET_ID_ABSENCES, "dimension": "ROWS",
-                      # Offset by 1 due to header row
-                      "startIndex": delete_index + 1,
-                      "endIndex": delete_index + 2}}}]}
-        try:
-            sheets.get_service().spreadsheets().batchUpdate(spreadsheetId=config.MEMBER_ACTIVITY_SPREADSHEET_ID,
-                                                            body=delete_body).execute()
-
-            deleted_sheets_absence = self.__absences[delete_index]
-            print(deleted_sheets_absence)
+        self.__queue_delete(delete_index, 1)
 
-            # Remove deleted member from members list
-            self.__absences = self.__absences[0:delete_index] + self.__absences[delete_index + 1:]
+        deleted_sheets_absence = self.__absences[delete_index]
+        print(deleted_sheets_absence)
 
-            return deleted_sheets_absence
+        # Remove deleted member from members list
+        self.__absences = self.__absences[0:delete_index] + self.__absences[delete_index + 1:]
+        self.__save()
 
-        except HttpError as error:
-            print(f"An error occurred: {error}")
-            raise error
+        return deleted_sheets_absence
 
-    def delete_user_absences(self, user_id: int):
+    async def delete_user_absences(self, user_id: int):
         delete_index = 0
         delete_count = 0
         for sheets_absence in self.__absences:
@@ -123,24 +158,12 @@ class AbsenceSheets:
             # Nothing to delete
             return []
 
-        delete_request = ({"deleteDimension": {
-            "range": {"sheetId": config.MEMBER_ACTIVITY_SHEET_ID_ABSENCES, "dimension": "ROWS",
-                      # Offset by 1 due to header row
-                      "startIndex": delete_index + 1,
-                      "endIndex": delete_index + delete_count + 1}}})
-
-        delete_body = {"requests": delete_request}
-        try:
-            sheets.get_service().spreadsheets().batchUpdate(spreadsheetId=config.MEMBER_ACTIVITY_SPREADSHEET_ID,
-                                                            body=delete_body).execute()
-
-            deleted_sheets_absences = self.__absences[delete_index:delete_index + delete_count]
+        self.__queue_delete(delete_index, delete_count)
 
-            # Remove deleted member from members list
-            self.__absences = self.__absences[0:delete_index] + self.__absences[delete_index + delete_count:]
+        deleted_sheets_absences = self.__absences[delete_index:delete_index + delete_count]
 
-            return deleted_sheets_absences
+        # Remove deleted member from members list
+        self.__absences = self.__absences[0:delete_index] + self.__absences[delete_index + delete_count:]
+        self.__save()
 
-        except HttpError as error:
-            print(f"An error occurred: {error}")
-            raise error
+        return deleted_sheets_absences
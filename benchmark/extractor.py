@@ -0,0 +1,237 @@
+"""Renders synthetic guild contribution screenshots with known IGNs and scores, and measures how fast and how accurately
+member.extractor reads them, offline.
+
+Reports the per-stage latency of one screenshot at a time (decode, preprocess, OCR, match), then runs extract() end to
+end on the worker pool and reports screenshots per second, and the precision and recall of its results overall and for
+each font and noise level.
+
+Usage: python -m benchmark.extractor [--screenshots 24] [--tessdata /usr/share/tesseract-ocr/5/tessdata]
+"""
+import argparse
+import asyncio
+import itertools
+import os
+import random
+import tempfile
+import time
+from collections import Counter
+
+import cv2
+import numpy as np
+
+import config
+from benchmark.matcher import random_ign
+from member import extractor, ocr_cache
+from member.matcher import IgnMatcher, assign
+
+# Fonts the list is rendered in
+FONTS = {
+    'simplex': cv2.FONT_HERSHEY_SIMPLEX,
+    'duplex': cv2.FONT_HERSHEY_DUPLEX,
+    'complex': cv2.FONT_HERSHEY_COMPLEX,
+    'triplex': cv2.FONT_HERSHEY_TRIPLEX,
+}
+# Standard deviations of the Gaussian noise added to the screenshots
+NOISE_LEVELS = [0, 12, 24]
+SCREENSHOT_HEIGHT = 600
+SCREENSHOT_WIDTH = 800
+BACKGROUND = (46, 40, 38)
+TEXT_COLOUR = (226, 226, 226)
+FONT_SCALE = 0.5
+ROW_HEIGHT = 24
+ROWS_PER_SCREENSHOT = 17
+# Most the list is scrolled down by, in pixels, in screenshots that overlap the previous one
+MAX_SCROLL_OFFSET = 6
+# Right edges of the weekly mission, culvert and flag race columns, from the left of the list
+NUMBER_COLUMNS = [250, 340, 420]
+
+
+class Row:
+    def __init__(self, ign: str, mission: int, culvert: int, flag: int):
+        self.ign = ign
+        self.mission = mission
+        self.culvert = culvert
+        self.flag = flag
+
+    def key(self):
+        return self.ign, self.mission, self.culvert, self.flag
+
+
+class Screenshot:
+    def __init__(self, font: str, noise: int, rows: list[Row], byte_image: bytes):
+        self.font = font
+        self.noise = noise
+        self.rows = rows
+        self.byte_image = byte_image
+
+
+def random_row(rng: random.Random, ign: str):
+    mission = rng.randint(0, 7)
+    culvert = rng.choice([0, rng.randint(1, 999), rng.randint(1000, 60000)])
+    flag = rng.choice([0, rng.randrange(0, 1000, 5)])
+    return Row(ign, mission, culvert, flag)
+
+
+def render(rng: random.Random, font: str, noise: int, rows: list[Row], offset: int = 0) -> bytes:
+    img = np.full((SCREENSHOT_HEIGHT, SCREENSHOT_WIDTH, 3), BACKGROUND, dtype=np.uint8)
+    y1, _, x1, _ = config.OCR_CROP
+    for index, row in enumerate(rows):
+        baseline = y1 + offset + (index + 1) * ROW_HEIGHT - 6
+        cv2.putText(img, row.ign, (x1 + 6, baseline), FONTS[font], FONT_SCALE, TEXT_COLOUR, 1, cv2.LINE_AA)
+        for text, right in zip([str(row.mission), f'{row.culvert:,}', f'{row.flag:,}'], NUMBER_COLUMNS):
+            (width, height), _ = cv2.getTextSize(text, FONTS[font], FONT_SCALE, 1)
+            cv2.putText(img, text, (x1 + right - width, baseline), FONTS[font], FONT_SCALE, TEXT_COLOUR, 1,
+                        cv2.LINE_AA)
+    if noise:
+        noisy = img.astype(np.float32) + np.random.default_rng(rng.randrange(2 ** 32)).normal(0, noise, img.shape)
+        img = np.clip(noisy, 0, 255).astype(np.uint8)
+    return cv2.imencode('.png', img)[1].tobytes()
+
+
+def corpus(rng: random.Random, count: int, roster: list[str], overlap: int = 0) -> list[Screenshot]:
+    """Screenshots cycling through every font and noise level.
+
+    Each screenshot lists IGNs no other screenshot lists, except for the overlap, which is how many rows at the top of
+    each screenshot of a font and noise level are at the bottom of the previous one, like scrolling screenshots.
+    """
+    igns = iter(rng.sample(roster, len(roster)))
+    combinations = list(itertools.product(FONTS, NOISE_LEVELS))
+    screenshots = []
+    for font, noise in combinations:
+        rows = []
+        for _ in range(-(-count // len(combinations))):
+            rows = rows[-overlap:] if overlap else []
+            rows += [random_row(rng, ign) for ign in itertools.islice(igns, ROWS_PER_SCREENSHOT - len(rows))]
+            offset = rng.randint(0, MAX_SCROLL_OFFSET) if overlap else 0
+            screenshots.append(Screenshot(font, noise, rows, render(rng, font, noise, rows, offset)))
+    return screenshots[:count]
+
+
+def time_stages(screenshots: list[Screenshot], roster: list[str]):
+    """Runs each stage in this process, one screenshot at a time, and returns the seconds spent in each and the OCR
+    pass stats."""
+    extractor._init_worker(config.TESSERACT_OCR_PATH, config.TESSERACT_TESSDATA_PATH, config.OCR_TWO_PASS)
+    matcher = IgnMatcher(roster, {}) if config.OCR_TWO_PASS else None
+    seconds = Counter()
+    pass_stats = extractor.OcrPassStats()
+    data = []
+    for screenshot in screenshots:
+        started_at = time.perf_counter()
+        img = extractor._decode(screenshot.byte_image)
+        decoded_at = time.perf_counter()
+        img = extractor._preprocess(img, config.OCR_CROP)
+        preprocessed_at = time.perf_counter()
+        text, stats = extractor._read_text(img, matcher)
+        data += extractor.parse_rows(text)
+        seconds['decode'] += decoded_at - started_at
+        seconds['preprocess'] += preprocessed_at - decoded_at
+        seconds['ocr first pass'] += stats.first_pass_seconds
+        seconds['ocr second pass'] += stats.second_pass_seconds
+        pass_stats.add(stats)
+
+    started_at = time.perf_counter()
+    matcher = IgnMatcher(roster, {})
+    assign([matcher.candidates(matcher.custom_ign_fix(row[0])) for row in data])
+    seconds['match'] += time.perf_counter() - started_at
+    return seconds, pass_stats
+
+
+async def run_extract(screenshots: list[Screenshot], roster: list[str]):
+    async def downloaded(byte_image: bytes):
+        return byte_image
+
+    started_at = time.perf_counter()
+    first_result_seconds = None
+    results = []
+    errors = []
+    async for extracted in extractor.extract(roster, ['Grove'] * len(roster), {},
+                                             [downloaded(screenshot.byte_image) for screenshot in screenshots]):
+        if first_result_seconds is None:
+            first_result_seconds = time.perf_counter() - started_at
+        if isinstance(extracted, extractor.MatchResult):
+            results = extracted.results
+        errors += extracted.errors
+    return results, errors, first_result_seconds
+
+
+def score(screenshots: list[Screenshot], results: list[extractor.Result]):
+    """Returns the screenshot of each correct result, and the number of results that are wrong."""
+    screenshot_of_row = {row.key(): screenshot for screenshot in screenshots for row in screenshot.rows}
+    correct = []
+    wrong = 0
+    for result in results:
+        key = (result.matched_ign, result.weekly_mission, result.culvert, result.flag)
+        if key in screenshot_of_row:
+            correct.append(screenshot_of_row.pop(key))
+        else:
+            wrong += 1
+    return correct, wrong
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--screenshots', type=int, default=len(FONTS) * len(NOISE_LEVELS) * 2)
+    parser.add_argument('--roster-size', type=int, default=600, help='IGNs in the roster, listed or not')
+    parser.add_argument('--tesseract', default=config.TESSERACT_OCR_PATH or 'tesseract',
+                        help='Path to the tesseract binary, when tesserocr is not installed')
+    parser.add_argument('--tessdata', default=config.TESSERACT_TESSDATA_PATH, help='Language data directory')
+    parser.add_argument('--languages', default=extractor.OCR_LANGUAGES, help='Tesseract languages to read IGNs in')
+    parser.add_argument('--one-pass', action='store_true', help='Read IGNs in every language in a single pass')
+    parser.add_argument('--overlap', type=int, default=0,
+                        help='Rows at the top of each screenshot that are at the bottom of the previous one')
+    parser.add_argument('--no-dedupe', action='store_true', help='OCR rows that overlap the previous screenshot')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    config.TESSERACT_OCR_PATH = args.tesseract
+    config.TESSERACT_TESSDATA_PATH = args.tessdata
+    config.OCR_TWO_PASS = not args.one_pass
+    config.OCR_DEDUPE_ROWS = not args.no_dedupe
+    # Worker processes are forked, so they see this too
+    extractor.OCR_LANGUAGES = args.languages
+
+    rng = random.Random(args.seed)
+    roster = sorted({random_ign(rng) for _ in range(max(args.roster_size, args.screenshots * ROWS_PER_SCREENSHOT))})
+    screenshots = corpus(rng, args.screenshots, roster, args.overlap)
+    # Rows in the overlap of two screenshots are one row
+    combination_rows: dict[tuple[str, int], set] = {}
+    for screenshot in screenshots:
+        combination_rows.setdefault((screenshot.font, screenshot.noise), set()).update(
+            row.key() for row in screenshot.rows)
+    row_count = sum(len(rows) for rows in combination_rows.values())
+    print(f'Corpus: {len(screenshots)} screenshots, {row_count} rows, {len(roster)} roster IGNs, '
+          f'{len(FONTS)} fonts, noise {NOISE_LEVELS}, overlap {args.overlap} rows')
+    print(f'OCR: {"tesserocr" if extractor.tesserocr is not None else "pytesseract"}, {args.languages}, '
+          f'{"one pass" if args.one_pass else "two pass"}, '
+          f'{"overlapping rows read again" if args.no_dedupe else "overlapping rows cropped"}')
+
+    seconds, pass_stats = time_stages(screenshots, roster)
+    print('Per screenshot: ' + ', '.join(f'{stage} {stage_seconds / len(screenshots) * 1000:.1f}ms'
+                                         for stage, stage_seconds in seconds.items()))
+    print(f'OCR passes: {pass_stats}')
+
+    with tempfile.TemporaryDirectory() as directory:
+        # Start from an empty OCR cache, so every screenshot is read
+        ocr_cache.OCR_CACHE_PATH = os.path.join(directory, 'ocr_cache.db')
+        started_at = time.perf_counter()
+        results, errors, first_result_seconds = asyncio.run(run_extract(screenshots, roster))
+        extract_seconds = time.perf_counter() - started_at
+        ocr_cache._connection.close()
+    extractor._get_executor().shutdown()
+
+    correct, wrong = score(screenshots, results)
+    print(f'extract(): {extract_seconds:.2f}s on {extractor.MAX_OCR_WORKERS} workers, '
+          f'{len(screenshots) / extract_seconds:.2f} screenshots/s, first screenshot read after '
+          f'{first_result_seconds:.2f}s')
+    print(f'Precision: {len(correct) / max(len(results), 1):.3f} ({len(correct)}/{len(results)} results), '
+          f'recall: {len(correct) / row_count:.3f} ({len(correct)}/{row_count} rows)')
+    print(f'Errors: {dict(Counter(error[0] for error in errors))}')
+
+    correct_counts = Counter((screenshot.font, screenshot.noise) for screenshot in correct)
+    for font, noise in sorted(combination_rows):
+        print(f'  {font:8} noise {noise:2}: '
+              f'recall {correct_counts[(font, noise)] / len(combination_rows[(font, noise)]):.3f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""Benchmarks IgnMatcher against the per-line process.extractOne scans it replaced, and times the assignment of
+OCR rows to roster IGNs.
+
+Usage: python -m benchmark.matcher [--roster-size 600] [--queries 400]
+"""
+import argparse
+import random
+import string
+import time
+
+from fuzzywuzzy import process as fuzzywuzzy_process
+
+from member import matcher as matcher_module
+from member.matcher import IgnMatcher, assign, rapidfuzz
+
+# Characters OCR commonly confuses in IGNs
+OCR_CONFUSIONS = {'l': 'I', 'I': 'l', 'O': '0', '0': 'O', 'g': '9', 'rn': 'm', 'e': 'c', 'i': 'j'}
+
+
+def random_ign(rng: random.Random):
+    return ''.join(rng.choice(string.ascii_letters + string.digits) for _ in range(rng.randint(4, 12)))
+
+
+def misread(rng: random.Random, ign: str):
+    """Adds the kind of errors OCR makes to an IGN."""
+    for _ in range(rng.randint(0, 2)):
+        confusions = [(old, new) for old, new in OCR_CONFUSIONS.items() if old in ign]
+        if confusions and rng.random() < 0.7:
+            old, new = rng.choice(confusions)
+            ign = ign.replace(old, new, 1)
+        else:
+            position = rng.randrange(len(ign))
+            ign = ign[:position] + ign[position + 1:]
+    return ign or 'x'
+
+
+def baseline(list_of_igns: list[str], custom_ign_map: dict[str, str], igns: list[str]):
+    matches = []
+    for ign in igns:
+        match, percent = fuzzywuzzy_process.extractOne(ign, custom_ign_map.keys())
+        if percent == 100:
+            ign = custom_ign_map[match]
+        matches.append(fuzzywuzzy_process.extractOne(ign, list_of_igns))
+    return matches
+
+
+def indexed(list_of_igns: list[str], custom_ign_map: dict[str, str], igns: list[str]):
+    matcher = IgnMatcher(list_of_igns, custom_ign_map)
+    return [matcher.match(matcher.custom_ign_fix(ign)) for ign in igns]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--roster-size', type=int, default=600, help='Grove and Shrub characters in the roster')
+    parser.add_argument('--queries', type=int, default=400, help='OCR\'d IGNs to match')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    roster = sorted({random_ign(rng) for _ in range(args.roster_size)})
+    custom_ign_map = {misread(rng, ign): ign for ign in rng.sample(roster, min(50, len(roster)))}
+    queries = [misread(rng, rng.choice(roster)) for _ in range(args.queries - args.queries // 20)]
+    # Lines that are not a roster IGN at all
+    queries += [random_ign(rng) for _ in range(args.queries // 20)]
+
+    print(f'Roster: {len(roster)} IGNs, {len(custom_ign_map)} custom mappings, {len(queries)} queries')
+    print(f'Scorer: {"rapidfuzz" if rapidfuzz else "fuzzywuzzy"}')
+
+    started_at = time.perf_counter()
+    baseline_matches = baseline(roster, custom_ign_map, queries)
+    baseline_seconds = time.perf_counter() - started_at
+
+    started_at = time.perf_counter()
+    indexed_matches = indexed(roster, custom_ign_map, queries)
+    indexed_seconds = time.perf_counter() - started_at
+
+    same_match = sum(baseline_match[0] == indexed_match[0]
+                     for baseline_match, indexed_match in zip(baseline_matches, indexed_matches))
+    same_decision = sum((baseline_match[1] >= 70) == (indexed_match[1] >= 70)
+                        for baseline_match, indexed_match in zip(baseline_matches, indexed_matches))
+    print(f'extractOne scans: {baseline_seconds:.3f}s ({baseline_seconds / len(queries) * 1000:.3f}ms per IGN)')
+    print(f'IgnMatcher:       {indexed_seconds:.3f}s ({indexed_seconds / len(queries) * 1000:.3f}ms per IGN), '
+          f'{baseline_seconds / indexed_seconds:.1f}x faster')
+    print(f'Same match: {same_match}/{len(queries)}, same 70% decision: {same_decision}/{len(queries)}')
+
+    # A week of screenshots: 200 rows against a roster of 400
+    assignment_roster = roster[:400]
+    rows = [misread(rng, ign) for ign in rng.sample(assignment_roster, min(200, len(assignment_roster)))]
+    started_at = time.perf_counter()
+    matcher = IgnMatcher(assignment_roster, {})
+    rows_candidates = [matcher.candidates(ign) for ign in rows]
+    candidates_seconds = time.perf_counter() - started_at
+    started_at = time.perf_counter()
+    assignment = assign(rows_candidates)
+    assign_seconds = time.perf_counter() - started_at
+    edges = sum(len(candidates) for candidates in rows_candidates)
+    print(f'Assignment of {len(rows)} rows to {len(assignment_roster)} IGNs ({edges} matches of at least 70%, '
+          f'{"scipy" if matcher_module.linear_sum_assignment else "pure Python"}): '
+          f'candidates {candidates_seconds:.3f}s, assignment {assign_seconds:.3f}s, '
+          f'{sum(i is not None for i in assignment)} rows assigned')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+"""Benchmarks the dict-indexed character lookup and participation scoring of member.track against the per-member scans
+they replaced, and checks they give the same scores.
+
+Usage: python -m benchmark.track [--members 500] [--mules 6]
+"""
+import argparse
+import random
+import time
+
+from benchmark.matcher import random_ign
+from member import sheets, track
+from member.sheets_shrub import ShrubParticipation, WeeklyParticipation
+
+
+class Result:
+    """The parts of an extractor.Result that tracking reads."""
+
+    def __init__(self, matched_ign: str, guild: str, rng: random.Random):
+        self.matched_ign = matched_ign
+        self.guild = guild
+        self.matched_percent = rng.randint(70, 100)
+        self.weekly_mission = rng.randint(0, 7)
+        self.culvert = rng.choice([0, rng.randint(1, 60000)])
+        self.flag = rng.choice([0, rng.randrange(0, 1000, 5)])
+
+    def raw_ign(self):
+        return self.matched_ign
+
+
+def baseline_tracks(results: list[Result], characters: list[track.Character], day_string: str):
+    tracks = []
+    for result in results:
+        try:
+            character = next(character for character in characters
+                             if result.matched_ign == character.ign and result.guild == character.guild)
+            tracks.append(sheets.Track(day_string, character.discord_mention, result.matched_ign, character.guild,
+                                       result.weekly_mission, result.culvert, result.flag, result.raw_ign(),
+                                       result.matched_percent))
+            characters.remove(character)
+        except StopIteration:
+            pass
+    return tracks
+
+
+def baseline_scores(mp_list: list[sheets.MemberParticipation], scores: list[int], tracks: list[sheets.Track]):
+    scores = [None] * len(mp_list) if scores is None else scores + [None] * (len(mp_list) - len(scores))
+    for x in range(len(mp_list)):
+        member = mp_list[x]
+        for sheets_track in tracks:
+            if member.discord_mention == sheets_track.discord_mention:
+                new_score = sheets_track.mission / 2
+                if sheets_track.culvert > 0:
+                    new_score += 10
+                if sheets_track.flag > 0:
+                    new_score += 10
+                if scores[x] is None or new_score > scores[x]:
+                    scores[x] = new_score
+    return scores
+
+
+def baseline_shrub(sp_list: list[ShrubParticipation], tracks: list[sheets.Track]):
+    wp_list = []
+    for member in sp_list:
+        participation = WeeklyParticipation()
+        wp_list.append(participation)
+        for sheets_track in tracks:
+            if member.discord_mention == sheets_track.discord_mention and sheets_track.mission > 0:
+                participation.add(sheets_track.ign, sheets_track.culvert, sheets_track.flag)
+    return wp_list
+
+
+def timed(function, *args):
+    started_at = time.perf_counter()
+    value = function(*args)
+    return value, time.perf_counter() - started_at
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--members', type=int, default=500, help='Members in each of Grove and Shrub')
+    parser.add_argument('--mules', type=int, default=6, help='Most Shrub mules per member')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    day_string = '2024-01-04'
+    mp_list = []
+    sp_list = []
+    for x in range(args.members):
+        mention = f'<@{100000 + x}>'
+        grove_igns = '\n'.join(random_ign(rng) for _ in range(rng.randint(1, 2)))
+        mule_igns = '\n'.join(random_ign(rng) for _ in range(rng.randint(1, args.mules)))
+        mp_list.append(sheets.MemberParticipation(x, grove_igns, '', '', 0, mention, '', '', '', '', 0, 0))
+        sp_list.append(ShrubParticipation(x, grove_igns, mule_igns, '', mention))
+    characters = track.__grove_characters(mp_list) + track.__shrub_characters(sp_list)
+    # Most characters are in a week's screenshots
+    results = [Result(character.ign, character.guild, rng) for character in characters if rng.random() < 0.9]
+    rng.shuffle(results)
+    scores = [rng.choice([None, 10]) for _ in mp_list]
+    print(f'Roster: {len(mp_list)} Grove members, {len(sp_list)} Shrub members, {len(characters)} characters, '
+          f'{len(results)} results')
+
+    baseline_characters = list(characters)
+    tracks, baseline_seconds = timed(baseline_tracks, results, baseline_characters, day_string)
+    indexed_characters = list(characters)
+    started_at = time.perf_counter()
+    character_index = track.__index_characters(indexed_characters)
+    indexed_tracks = track.__tracks_from_results(results, character_index, day_string)
+    track.__remove_tracked(indexed_characters, character_index)
+    indexed_seconds = time.perf_counter() - started_at
+    same = ([str(sheets_track) for sheets_track in tracks] == [str(sheets_track) for sheets_track in indexed_tracks]
+            and baseline_characters == indexed_characters)
+    print(f'Character lookup: scans {baseline_seconds * 1000:.1f}ms, index {indexed_seconds * 1000:.1f}ms, '
+          f'{baseline_seconds / indexed_seconds:.0f}x faster, same tracks: {same}')
+
+    grove_tracks = [sheets_track for sheets_track in tracks if sheets_track.guild == track.GUILD_GROVE]
+    shrub_tracks = [sheets_track for sheets_track in tracks if sheets_track.guild == track.GUILD_SHRUB]
+
+    baseline, baseline_seconds = timed(baseline_scores, mp_list, scores, grove_tracks)
+    indexed, indexed_seconds = timed(track.__weekly_participation_scores, mp_list, scores, grove_tracks)
+    print(f'Grove scores: scans {baseline_seconds * 1000:.1f}ms, index {indexed_seconds * 1000:.1f}ms, '
+          f'{baseline_seconds / indexed_seconds:.0f}x faster, same scores: {baseline == indexed}')
+
+    baseline, baseline_seconds = timed(baseline_shrub, sp_list, shrub_tracks)
+    indexed, indexed_seconds = timed(track.__shrub_participation, sp_list, shrub_tracks)
+    same = [wp.to_sheets_value() for wp in baseline] == [wp.to_sheets_value() for wp in indexed]
+    print(f'Shrub participation: scans {baseline_seconds * 1000:.1f}ms, index {indexed_seconds * 1000:.1f}ms, '
+          f'{baseline_seconds / indexed_seconds:.0f}x faster, same participation: {same}')
+
+
+if __name__ == '__main__':
+    main()
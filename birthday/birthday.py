@@ -6,6 +6,7 @@ import config
 from birthday.service import BirthdayService
 from birthday.sheets import Birthday as SheetsBirthday
 from birthday.sheets import BirthdaySheets
+from utils import sheets
 from utils.constants import ONE_DAY_IN_SECONDS, GROVE_GREEN
 
 
@@ -51,8 +52,13 @@ class Birthday:
     def on_ready(self):
         self._restart_service()
 
-    def on_member_remove(self, member: discord.Member):
-        deleted_sheets_birthday = self.sheets_birthday.delete_user_birthday(member.id)
+    async def pull(self, prefetch: sheets.Prefetch = None):
+        if await self.sheets_birthday.sync_data(prefetch) and self.client.is_ready():
+            # Before the bot is ready, on_ready starts the service with the latest data
+            self._restart_service()
+
+    async def on_member_remove(self, member: discord.Member):
+        deleted_sheets_birthday = await self.sheets_birthday.delete_user_birthday(member.id)
         if deleted_sheets_birthday:
             self._restart_service()
 
@@ -97,9 +103,9 @@ class Birthday:
                 if existing_sheets_birthday:
                     existing_sheets_birthday.birthday_str = birthday_str
                     existing_sheets_birthday.reset_offset = reset_offset
-                    self.sheets_birthday.update_birthdays(self.sheets_birthday.birthdays)
+                    await self.sheets_birthday.update_birthdays(self.sheets_birthday.birthdays)
                 else:
-                    self.sheets_birthday.append_birthday(new_sheets_birthday)
+                    await self.sheets_birthday.append_birthday(new_sheets_birthday)
 
                 self._restart_service()
 
@@ -145,7 +151,7 @@ class Birthday:
             await interaction.user.remove_roles(
                 self.client.get_guild(config.GROVE_GUILD_ID).get_role(config.GROVE_ROLE_ID_BIRTHDAY))
 
-        deleted_sheets_birthday = self.sheets_birthday.delete_user_birthday(interaction.user.id)
+        deleted_sheets_birthday = await self.sheets_birthday.delete_user_birthday(interaction.user.id)
 
         if deleted_sheets_birthday:
             self._restart_service()
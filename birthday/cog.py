@@ -1,7 +1,10 @@
+import functools
+
 from discord import app_commands
 from discord.ext import commands
 
 from birthday.birthday import Birthday
+from utils import sheets
 
 birthday: Birthday
 
@@ -43,7 +46,7 @@ class BirthdayCog(commands.Cog):
 
     @commands.Cog.listener()
     async def on_member_remove(self, member):
-        birthday.on_member_remove(member)
+        await birthday.on_member_remove(member)
 
     absence_group = BirthdayGroup()
 
@@ -51,4 +54,10 @@ class BirthdayCog(commands.Cog):
 async def setup(bot):
     global birthday
     birthday = Birthday(bot)
+    if birthday.sheets_birthday.load_local():
+        # Start from the last synced data, and bring it up to date without holding up startup
+        sheets.pull_in_background(functools.partial(birthday.pull, bot.prefetch))
+    else:
+        await birthday.sheets_birthday.sync_data(bot.prefetch)
+    sheets.register_puller(birthday.pull)
     await bot.add_cog(BirthdayCog(bot))
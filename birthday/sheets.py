@@ -2,10 +2,8 @@ from __future__ import print_function
 
 from datetime import datetime, timezone, timedelta
 
-from googleapiclient.errors import HttpError
-
 import config
-from utils import sheets
+from utils import sheets, store
 from utils.constants import ONE_DAY_IN_SECONDS
 
 
@@ -55,41 +53,81 @@ class Birthday:
 
 class BirthdaySheets:
     RANGE_BIRTHDAYS = 'Birthdays!A2:C'
+    TABLE_BIRTHDAYS = store.Table('birthdays')
 
     def __init__(self):
-        self.__birthdays = self.__get_birthdays()
+        self.__birthdays: list[Birthday] = []
+        self.__loaded = False
 
     @property
     def birthdays(self):
         return self.__birthdays
 
+    async def sync_data(self, prefetch: sheets.Prefetch = None):
+        """Reads the birthdays from Sheets into the local store, and returns whether they changed.
+
+        The local store is used as is while local changes are waiting to be sent, or if Sheets cannot be read.
+        """
+        revision = self.TABLE_BIRTHDAYS.revision
+        changed = False
+        if await sheets.push():
+            try:
+                birthdays_values = await self.__get_birthdays_values(prefetch)
+            except sheets.REQUEST_ERRORS as error:
+                print(f'Using the local birthdays, Sheets could not be read: {error}')
+            else:
+                if revision == self.TABLE_BIRTHDAYS.revision:
+                    self.TABLE_BIRTHDAYS.mark_synced()
+                    if birthdays_values != self.TABLE_BIRTHDAYS.load():
+                        self.TABLE_BIRTHDAYS.replace(birthdays_values)
+                        changed = True
+
+        if changed or not self.__loaded:
+            self.__load()
+        return changed
+
+    def load_local(self):
+        """Loads the birthdays from the local store, if it has been synced before. Returns whether it was loaded."""
+        if self.TABLE_BIRTHDAYS.synced_at is None:
+            return False
+        self.__load()
+        return True
+
+    def __load(self):
+        self.__birthdays = list(map(lambda birthdays_value: Birthday.from_sheets_value(birthdays_value),
+                                    self.TABLE_BIRTHDAYS.load()))
+        self.__loaded = True
+
     @staticmethod
-    def __get_birthdays():
-        result = sheets.get_service().spreadsheets().values().get(
-            spreadsheetId=config.MEMBER_ACTIVITY_SPREADSHEET_ID,
-            range=BirthdaySheets.RANGE_BIRTHDAYS).execute()
-        birthdays_values = result.get('values', [])
-        return list(map(lambda birthdays_value: Birthday.from_sheets_value(birthdays_value), birthdays_values))
-
-    def append_birthday(self, new_sheets_birthday: Birthday):
-        body = {'values': [new_sheets_birthday.to_sheets_value()]}
-        sheets.get_service().spreadsheets().values().append(spreadsheetId=config.MEMBER_ACTIVITY_SPREADSHEET_ID,
-                                                            range=self.RANGE_BIRTHDAYS, valueInputOption="RAW",
-                                                            body=body).execute()
+    async def __get_birthdays_values(prefetch: sheets.Prefetch = None):
+        batch_get = prefetch.batch_get if prefetch else sheets.batch_get
+        [birthdays_values] = await batch_get(config.MEMBER_ACTIVITY_SPREADSHEET_ID, [BirthdaySheets.RANGE_BIRTHDAYS])
+        return list(map(lambda birthdays_value: Birthday.from_sheets_value(birthdays_value).to_sheets_value(),
+                        birthdays_values))
+
+    def __save(self):
+        self.TABLE_BIRTHDAYS.replace([sheets_birthday.to_sheets_value() for sheets_birthday in self.__birthdays])
+
+    async def append_birthday(self, new_sheets_birthday: Birthday):
+        sheets.enqueue(config.MEMBER_ACTIVITY_SPREADSHEET_ID, 'append',
+                       {'range': self.RANGE_BIRTHDAYS, 'valueInputOption': 'RAW',
+                        'values': [new_sheets_birthday.to_sheets_value()]})
         self.__birthdays.append(new_sheets_birthday)
+        self.__save()
 
-    def update_birthdays(self, new_sheets_birthdays: list[Birthday]):
+    async def update_birthdays(self, new_sheets_birthdays: list[Birthday]):
 
         def birthday_to_sheets_values(sheets_birthday: Birthday):
             return sheets_birthday.to_sheets_value()
 
-        body = {'values': list(map(birthday_to_sheets_values, new_sheets_birthdays))}
-        sheets.get_service().spreadsheets().values().update(spreadsheetId=config.MEMBER_ACTIVITY_SPREADSHEET_ID,
-                                                            range=self.RANGE_BIRTHDAYS, valueInputOption="RAW",
-                                                            body=body).execute()
+        sheets.enqueue(config.MEMBER_ACTIVITY_SPREADSHEET_ID, 'values',
+                       {'valueInputOption': 'RAW',
+                        'data': [{'range': self.RANGE_BIRTHDAYS,
+                                  'values': list(map(birthday_to_sheets_values, new_sheets_birthdays))}]})
         self.__birthdays = new_sheets_birthdays
+        self.__save()
 
-    def delete_user_birthday(self, user_id: int):
+    async def delete_user_birthday(self, user_id: int):
         delete_index = 0
         for sheets_birthday in self.__birthdays:
             if sheets_birthday.user_id == user_id:
@@ -106,18 +144,13 @@ class BirthdaySheets:
                       "startIndex": delete_index + 1,
                       # Offset by 1 due to header row
                       "endIndex": delete_index + 2}}}]}
-        try:
-            sheets.get_service().spreadsheets().batchUpdate(spreadsheetId=config.MEMBER_ACTIVITY_SPREADSHEET_ID,
-                                                            body=delete_body).execute()
-
-            deleted_sheets_birthday = self.__birthdays[delete_index]
-            print(deleted_sheets_birthday)
+        sheets.enqueue(config.MEMBER_ACTIVITY_SPREADSHEET_ID, 'spreadsheet', delete_body)
 
-            # Remove deleted member from members list
-            self.__birthdays = self.__birthdays[0:delete_index] + self.__birthdays[delete_index + 1:]
+        deleted_sheets_birthday = self.__birthdays[delete_index]
+        print(deleted_sheets_birthday)
 
-            return deleted_sheets_birthday
+        # Remove deleted member from members list
+        self.__birthdays = self.__birthdays[0:delete_index] + self.__birthdays[delete_index + 1:]
+        self.__save()
 
-        except HttpError as error:
-            print(f"An error occurred: {error}")
-            raise error
+        return deleted_sheets_birthday
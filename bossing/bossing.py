@@ -10,6 +10,7 @@ from bossing.sheets import BossingSheets
 from bossing.sheets import Member as SheetsMember
 from bossing.sheets import NoShow as SheetsNoShow
 from bossing.sheets import Party as SheetsParty
+from utils import sheets
 
 
 class Bossing:
@@ -57,7 +58,7 @@ class Bossing:
                 await message.add_reaction('🕒')
                 await message.add_reaction('🔔')
                 sheets_party.check_in_message_id = message.id
-                self.sheets_bossing.update_parties()
+                await self.sheets_bossing.update_parties()
 
         async def on_check_in_reminder(sheets_party: SheetsParty):
             # Send reminder in party thread to people who didn't react
@@ -140,7 +141,7 @@ class Bossing:
                                                                     sheets_party.party_number),
                                         party_members_not_reacted))
                     print(no_shows)
-                    self.sheets_bossing.append_no_shows(no_shows)
+                    await self.sheets_bossing.append_no_shows(no_shows)
 
         self.boss_time_service = BossTimeService(on_check_in,
                                                  on_check_in_reminder,
@@ -165,9 +166,16 @@ class Bossing:
             # Chunks of 20
             await self._send(interaction, '\n'.join(event_logs[pos:pos + 20]), ephemeral=True)
 
+    async def pull(self, prefetch: sheets.Prefetch = None):
+        async with self.lock:
+            changed = await self.sheets_bossing.sync_data(prefetch)
+        if changed and self.client.is_ready():
+            # Before the bot is ready, on_ready starts the service with the latest data
+            self._restart_service()
+
     async def sync(self, interaction):
         async with self.lock:
-            self.sheets_bossing.sync_data()
+            await self.sheets_bossing.sync_data()
         self._restart_service()
 
         await self._send(interaction, 'Sync complete.', ephemeral=True)
@@ -336,13 +344,13 @@ class Bossing:
         await member.add_roles(discord_party)
 
         # Add member to member sheet
-        self.sheets_bossing.append_members([SheetsMember(boss_name=sheets_party.boss_name,
+        await self.sheets_bossing.append_members([SheetsMember(boss_name=sheets_party.boss_name,
                                                          party_number=sheets_party.party_number,
                                                          party_role_id=sheets_party.role_id, user_id=str(member.id),
                                                          job=job)])
 
         # Update party data
-        self._update_existing_party(discord_party)
+        await self._update_existing_party(discord_party)
 
         # Success
         added_message = f'Added {member.mention} *{job}* to {discord_party.mention}'
@@ -438,7 +446,7 @@ class Bossing:
 
             old_job = sheets_member.job
             sheets_member.job = new_job
-            self.sheets_bossing.update_member(sheets_member)
+            await self.sheets_bossing.update_member(sheets_member)
 
             # Success
             updated_message = f'Updated {member.mention} *{old_job}* to *{new_job}* in {discord_party.mention}'
@@ -543,12 +551,12 @@ class Bossing:
             raise Exception(f'Error - {member.mention} *{job}* is not in {discord_party.mention}.')
 
         # Remove member from member sheet
-        removed_sheets_member = self.sheets_bossing.delete_member(
+        removed_sheets_member = await self.sheets_bossing.delete_member(
             SheetsMember(boss_name=sheets_party.boss_name, party_number=sheets_party.party_number,
                          party_role_id=sheets_party.role_id, user_id=str(member.id), job=job))
 
         # Update party data
-        self._update_existing_party(discord_party)
+        await self._update_existing_party(discord_party)
 
         # Success
         removed_message = f'Removed {member.mention} *{removed_sheets_member.job}* from {discord_party.mention}'
@@ -684,7 +692,7 @@ class Bossing:
                 sheets_parties.append(new_sheets_party)
 
             # Update spreadsheet
-            self.sheets_bossing.update_parties(new_sheets_party)
+            await self.sheets_bossing.update_parties(new_sheets_party)
 
             # Create thread
             boss_forum = self.client.get_channel(int(self.sheets_bossing.bosses_dict[boss_name].forum_channel_id))
@@ -697,7 +705,7 @@ class Bossing:
                     sheets_party.party_thread_id = str(party_thread_with_message.thread.id)
                     sheets_party.party_message_id = str(party_thread_with_message.message.id)
                     break
-            self.sheets_bossing.update_parties()
+            await self.sheets_bossing.update_parties()
 
             await self._send(interaction,
                              f'Created {new_boss_party.name} {party_thread_with_message.thread.mention}',
@@ -799,7 +807,7 @@ class Bossing:
                     sheets_party.hour = str(hour)
                     sheets_party.minute = str(minute)
                     sheets_party.check_in_message_id = ''
-                    self.sheets_bossing.update_parties()
+                    await self.sheets_bossing.update_parties()
 
                     if sheets_party.boss_list_message_id:
                         # Update bossing list message
@@ -878,7 +886,7 @@ class Bossing:
             sheets_party.hour = ''
             sheets_party.minute = ''
             sheets_party.check_in_message_id = ''
-            self.sheets_bossing.update_parties()
+            await self.sheets_bossing.update_parties()
             self._restart_service()
 
             if sheets_party.boss_list_message_id:
@@ -983,7 +991,7 @@ class Bossing:
                 async with self.lock:
                     sheets_party.one_time = str(one_time_timestamp)
                     sheets_party.check_in_message_id = ''
-                    self.sheets_bossing.update_parties()
+                    await self.sheets_bossing.update_parties()
 
                     if sheets_party.boss_list_message_id:
                         # Update bossing list message
@@ -1062,7 +1070,7 @@ class Bossing:
 
             sheets_party.one_time = ''
             sheets_party.check_in_message_id = ''
-            self.sheets_bossing.update_parties()
+            await self.sheets_bossing.update_parties()
             self._restart_service()
 
             if sheets_party.boss_list_message_id:
@@ -1178,7 +1186,7 @@ class Bossing:
                         message = await bossing_parties_channel.fetch_message(sheets_party.boss_list_decorator_id)
                         await message.delete()
 
-                    self._update_existing_party(updated_discord_party)
+                    await self._update_existing_party(updated_discord_party)
                     self._restart_service()
 
                     if sheets_party.party_thread_id:
@@ -1235,7 +1243,7 @@ class Bossing:
                                  ephemeral=True)
 
             sheets_party.status = status
-            self.sheets_bossing.update_parties()
+            await self.sheets_bossing.update_parties()
             await self._send(interaction, f'{discord_party.name} is now {sheets_party.status.value}.', ephemeral=True,
                              log=True)
 
@@ -1308,7 +1316,7 @@ class Bossing:
             discord_party = await discord_party.edit(
                 name=f'{sheets_party.difficulty}{sheets_party.boss_name} Party {sheets_party.party_number}')
 
-            self.sheets_bossing.update_parties()
+            await self.sheets_bossing.update_parties()
             await self._send(interaction, f'{discord_party.name} is now {sheets_party.difficulty} difficulty.',
                              ephemeral=True,
                              log=True)
@@ -1413,7 +1421,7 @@ class Bossing:
         except IndexError:
             return
 
-        self.sheets_bossing.update_parties()
+        await self.sheets_bossing.update_parties()
 
         await self._send(interaction, 'Existing bossing party list deleted.', ephemeral=True)
 
@@ -1451,7 +1459,7 @@ class Bossing:
                              '\n3. If you are unable to make the bossing run at all for a week, let your party know as soon as possible, and find a fill for your spot.')
         await bossing_parties_channel.send(etiquette_message)
 
-        self.sheets_bossing.update_parties()
+        await self.sheets_bossing.update_parties()
 
         await self._send(interaction, 'New bossing party list complete.', ephemeral=True)
 
@@ -1473,7 +1481,7 @@ class Bossing:
 
         return parties
 
-    def _update_existing_party(self, discord_party):
+    async def _update_existing_party(self, discord_party):
         # Update party status and member count
         new_sheets_parties = self.sheets_bossing.parties
         for sheets_party in new_sheets_parties:
@@ -1489,7 +1497,7 @@ class Bossing:
                     sheets_party.boss_list_decorator_id = ''
                 break
 
-        self.sheets_bossing.update_parties()
+        await self.sheets_bossing.update_parties()
 
     async def update_boss_party_list_message(self, message: discord.Message, sheets_party: SheetsParty):
         party_sheets_members = self.sheets_bossing.parties_dict[sheets_party.role_id].members
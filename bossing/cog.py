@@ -1,9 +1,12 @@
+import functools
+
 import discord
 from discord import app_commands
 from discord.ext import commands
 
 import config
 from bossing.bossing import Bossing
+from utils import sheets
 
 bossing: Bossing
 
@@ -231,4 +234,10 @@ class BossingCog(commands.Cog):
 async def setup(bot):
     global bossing
     bossing = Bossing(bot)
+    if bossing.sheets_bossing.load_local():
+        # Start from the last synced data, and bring it up to date without holding up startup
+        sheets.pull_in_background(functools.partial(bossing.pull, bot.prefetch))
+    else:
+        await bossing.sheets_bossing.sync_data(bot.prefetch)
+    sheets.register_puller(bossing.pull)
     await bot.add_cog(BossingCog(bot))
@@ -1,13 +1,12 @@
 from __future__ import print_function
 
+import asyncio
 from datetime import datetime, timezone, timedelta
 from enum import Enum
 
-from googleapiclient.errors import HttpError
-
 import config
 from member.common import thursday
-from utils import sheets
+from utils import sheets, store
 from utils.constants import SEVEN_DAYS_IN_SECONDS
 
 
@@ -84,6 +83,24 @@ class Party:
     INDEX_BOSS_LIST_DECORATOR_ID = 14
     INDEX_CHECK_IN_MESSAGE_ID = 15
 
+    # Sheets column index of each field, used to track which cells have changed
+    FIELD_INDICES = {'role_id': INDEX_ROLE_ID,
+                     'boss_name': INDEX_BOSS_NAME,
+                     'difficulty': INDEX_DIFFICULTY,
+                     'party_number': INDEX_PARTY_NUMBER,
+                     'status': INDEX_STATUS,
+                     'member_count': INDEX_MEMBER_COUNT,
+                     'max_member_count': INDEX_MAX_MEMBER_COUNT,
+                     'weekday': INDEX_WEEKDAY,
+                     'hour': INDEX_HOUR,
+                     'minute': INDEX_MINUTE,
+                     'one_time': INDEX_ONE_TIME,
+                     'party_thread_id': INDEX_PARTY_THREAD_ID,
+                     'party_message_id': INDEX_PARTY_MESSAGE_ID,
+                     'boss_list_message_id': INDEX_BOSS_LIST_MESSAGE_ID,
+                     'boss_list_decorator_id': INDEX_BOSS_LIST_DECORATOR_ID,
+                     'check_in_message_id': INDEX_CHECK_IN_MESSAGE_ID}
+
     class PartyStatus(Enum):
         open = "open"
         exclusive = "exclusive"
@@ -117,6 +134,7 @@ class Party:
                  boss_list_message_id,
                  boss_list_decorator_id,
                  check_in_message_id):
+        self._dirty_indices = None  # Not tracked until all fields are set
         self.role_id = str(role_id)
         self.boss_name = str(boss_name)
         self.difficulty = str(difficulty)
@@ -133,6 +151,24 @@ class Party:
         self.boss_list_message_id = str(boss_list_message_id)
         self.boss_list_decorator_id = str(boss_list_decorator_id)
         self.check_in_message_id = str(check_in_message_id)
+        self._dirty_indices: set[int] = set()
+
+    def __setattr__(self, name, value):
+        dirty_indices = self.__dict__.get('_dirty_indices')
+        if dirty_indices is not None and name in Party.FIELD_INDICES:
+            current = getattr(self, name)
+            if (current.value if name == 'status' else current) != (
+                    value.value if name == 'status' else str(value)):
+                dirty_indices.add(Party.FIELD_INDICES[name])
+        super().__setattr__(name, value)
+
+    @property
+    def dirty_indices(self) -> list[int]:
+        """Sorted column indices of the fields that changed since the party was last written."""
+        return sorted(self._dirty_indices)
+
+    def clear_dirty(self):
+        self._dirty_indices.clear()
 
     @staticmethod
     def from_sheets_value(party_value: list[str]):
@@ -336,6 +372,11 @@ class NoShow:
                 str(self.party_number)]
 
 
+def column_letter(index: int):
+    # Parties and Members sheets do not go past column Z
+    return chr(ord('A') + index)
+
+
 class BossingSheets:
     SPREADSHEET_BOSS_PARTIES = config.BOSS_PARTIES_SPREADSHEET_ID  # The ID of the bossing parties spreadsheet
     SHEET_BOSS_PARTIES_MEMBERS = config.BOSS_PARTIES_SHEET_ID_MEMBERS  # The ID of the Members sheet
@@ -344,19 +385,21 @@ class BossingSheets:
     RANGE_PARTIES = 'Parties!A2:P'
     RANGE_MEMBERS = 'Members!A2:E'
     RANGE_NO_SHOWS = 'No Shows!A2:E'
+    FIRST_ROW_PARTIES = 2
+    TABLE_BOSSES = store.Table('bosses')
+    TABLE_DIFFICULTIES = store.Table('difficulties')
+    TABLE_PARTIES = store.Table('parties')
+    TABLE_MEMBERS = store.Table('bossing_members')
+    TABLES = [TABLE_BOSSES, TABLE_DIFFICULTIES, TABLE_PARTIES, TABLE_MEMBERS]
+    # Ranges read by sync_data, in the same order as TABLES
+    RANGES = [RANGE_BOSSES, RANGE_DIFFICULTIES, RANGE_PARTIES, RANGE_MEMBERS]
 
     @staticmethod
-    def __get_bosses_dict():
-        result = sheets.get_service().spreadsheets().values().get(spreadsheetId=BossingSheets.SPREADSHEET_BOSS_PARTIES,
-                                                                  range=BossingSheets.RANGE_BOSSES).execute()
-        bosses_values = result.get('values', [])
+    def __get_bosses_dict(bosses_values: list[list[str]], difficulties_values: list[list[str]]):
         bosses = {}
         for bosses_value in bosses_values:
             bosses[bosses_value[Boss.INDEX_BOSS_NAME]] = Boss(bosses_value)
 
-        result = sheets.get_service().spreadsheets().values().get(spreadsheetId=BossingSheets.SPREADSHEET_BOSS_PARTIES,
-                                                                  range=BossingSheets.RANGE_DIFFICULTIES).execute()
-        difficulties_values = result.get('values', [])
         for difficulties_value in difficulties_values:
             difficulty = Difficulty(difficulties_value)
             bosses[difficulties_value[Difficulty.INDEX_BOSS_NAME]].difficulties[difficulty.difficulty] = difficulty
@@ -364,17 +407,11 @@ class BossingSheets:
         return bosses
 
     @staticmethod
-    def __get_parties():
-        result = sheets.get_service().spreadsheets().values().get(spreadsheetId=BossingSheets.SPREADSHEET_BOSS_PARTIES,
-                                                                  range=BossingSheets.RANGE_PARTIES).execute()
-        party_values = result.get('values', [])
+    def __get_parties(party_values: list[list[str]]):
         return list(map(lambda party_value: Party.from_sheets_value(party_value), party_values))
 
     @staticmethod
-    def __get_members():
-        result = sheets.get_service().spreadsheets().values().get(spreadsheetId=BossingSheets.SPREADSHEET_BOSS_PARTIES,
-                                                                  range=BossingSheets.RANGE_MEMBERS).execute()
-        members_values = result.get('values', [])
+    def __get_members(members_values: list[list[str]]):
         return list(map(lambda members_value: Member.from_sheets_value(members_value), members_values))
 
     @staticmethod
@@ -394,6 +431,7 @@ class BossingSheets:
         return parties_dict
 
     _instance = None
+    _initialized = False
 
     def __new__(cls):
         if cls._instance is None:
@@ -402,17 +440,82 @@ class BossingSheets:
         return cls._instance
 
     def __init__(self):
+        if BossingSheets._initialized:
+            # Shared instance, keep the data that has already been synced
+            return
+        BossingSheets._initialized = True
         self.__bosses_dict: dict[str, Boss] = {}
         self.__parties: list[Party] = []
         self.__members: list[Member] = []
         self.__parties_dict: dict[str, PartyWithMembers] = {}
-        self.sync_data()
-
-    def sync_data(self):
-        self.__bosses_dict = self.__get_bosses_dict()
-        self.__parties = self.__get_parties()
-        self.__members = self.__get_members()
+        # Held while a row is deleted, since the row index is looked up before the request is sent
+        self.__lock = asyncio.Lock()
+        self.__write_queue = sheets.WriteQueue(self.SPREADSHEET_BOSS_PARTIES)
+        # Role IDs of the parties in the order of the rows last written to the Parties sheet
+        self.__written_party_role_ids: list[str] = []
+        self.__loaded = False
+
+    async def sync_data(self, prefetch: sheets.Prefetch = None):
+        """Reads the bossing data from Sheets into the local store, and returns whether it changed.
+
+        The local store is used as is while local changes are waiting to be sent, or if Sheets cannot be read.
+        """
+        await self.__write_queue.flush()
+        revisions = [table.revision for table in self.TABLES]
+        changed = False
+        if await sheets.push():
+            try:
+                batch_get = prefetch.batch_get if prefetch else sheets.batch_get
+                bosses_values, difficulties_values, party_values, members_values = await batch_get(
+                    self.SPREADSHEET_BOSS_PARTIES, self.RANGES)
+            except sheets.REQUEST_ERRORS as error:
+                print(f'Using the local bossing data, Sheets could not be read: {error}')
+            else:
+                if revisions == [table.revision for table in self.TABLES]:
+                    # Not changed locally during the read
+                    for table in self.TABLES:
+                        table.mark_synced()
+                    changed = self.__store_values(
+                        [bosses_value[:Boss.LENGTH] + [''] * (Boss.LENGTH - len(bosses_value))
+                         for bosses_value in bosses_values],
+                        [difficulties_value[:Difficulty.LENGTH] + [''] * (Difficulty.LENGTH - len(difficulties_value))
+                         for difficulties_value in difficulties_values],
+                        [Party.from_sheets_value(party_value).to_sheets_value() for party_value in party_values],
+                        [Member.from_sheets_value(members_value).to_sheets_value() for members_value in members_values])
+
+        if changed or not self.__loaded:
+            self.__load()
+        return changed
+
+    def load_local(self):
+        """Loads the bossing data from the local store, if it has been synced before. Returns whether it was loaded."""
+        if any(table.synced_at is None for table in self.TABLES):
+            return False
+        self.__load()
+        return True
+
+    def __store_values(self, *values: list[list[str]]):
+        changed = False
+        for table, table_values in zip(self.TABLES, values):
+            if table.load() != table_values:
+                table.replace(table_values)
+                changed = True
+        return changed
+
+    def __load(self):
+        bosses_values, difficulties_values, party_values, members_values = [table.load() for table in self.TABLES]
+        self.__bosses_dict = self.__get_bosses_dict(bosses_values, difficulties_values)
+        self.__parties = self.__get_parties(party_values)
+        self.__written_party_role_ids = [sheets_party.role_id for sheets_party in self.__parties]
+        self.__members = self.__get_members(members_values)
         self.__parties_dict = self.__get_parties_dict(self.__parties, self.__members)
+        self.__loaded = True
+
+    def __save_parties(self):
+        self.TABLE_PARTIES.replace([sheets_party.to_sheets_value() for sheets_party in self.__parties])
+
+    def __save_members(self):
+        self.TABLE_MEMBERS.replace([sheets_member.to_sheets_value() for sheets_member in self.__members])
 
     @property
     def bosses_dict(self):
@@ -433,29 +536,62 @@ class BossingSheets:
     def get_boss_names(self):
         return list(self.__bosses_dict.keys())
 
-    def update_parties(self, *added_parties: Party):
-        body = {'values': [sheets_party.to_sheets_value() for sheets_party in self.__parties]}
-        sheets.get_service().spreadsheets().values().update(spreadsheetId=self.SPREADSHEET_BOSS_PARTIES,
-                                                            range=self.RANGE_PARTIES, valueInputOption="USER_ENTERED",
-                                                            body=body).execute()
+    async def update_parties(self, *added_parties: Party):
+        role_ids = [sheets_party.role_id for sheets_party in self.__parties]
+        if role_ids[:len(self.__written_party_role_ids)] != self.__written_party_role_ids:
+            # Parties were inserted or reordered, so existing rows moved and the whole range has to be rewritten
+            self.__write_queue.update(self.RANGE_PARTIES,
+                                      [sheets_party.to_sheets_value() for sheets_party in self.__parties])
+        else:
+            for range_name, values in self.__get_changed_party_ranges():
+                self.__write_queue.update(range_name, values)
+
+        for sheets_party in self.__parties:
+            sheets_party.clear_dirty()
+        self.__written_party_role_ids = role_ids
+        self.__save_parties()
 
         for added_party in added_parties:
             self.__parties_dict[added_party.role_id] = PartyWithMembers(added_party)
 
-    def append_members(self, new_sheets_members: list[Member]):
+    def __get_changed_party_ranges(self):
+        """Returns the ranges and values of the Parties cells that changed since they were last written.
+
+        Appended parties are written as whole rows, and each run of adjacent changed fields in an existing party is
+        written as one range.
+        """
+        changed_ranges = []
+        for index, sheets_party in enumerate(self.__parties):
+            row = index + self.FIRST_ROW_PARTIES
+            sheets_value = sheets_party.to_sheets_value()
+            if index >= len(self.__written_party_role_ids):
+                changed_ranges.append((f'Parties!A{row}:{column_letter(Party.LENGTH - 1)}{row}', [sheets_value]))
+                continue
+
+            dirty_indices = sheets_party.dirty_indices
+            while dirty_indices:
+                start = end = dirty_indices.pop(0)
+                while dirty_indices and dirty_indices[0] == end + 1:
+                    end = dirty_indices.pop(0)
+                changed_ranges.append((f'Parties!{column_letter(start)}{row}:{column_letter(end)}{row}',
+                                       [sheets_value[start:end + 1]]))
+        return changed_ranges
+
+    async def append_members(self, new_sheets_members: list[Member]):
         def member_to_sheets_values(sheets_member: Member):
             return sheets_member.to_sheets_value()
 
-        body = {'values': list(map(member_to_sheets_values, new_sheets_members))}
-        sheets.get_service().spreadsheets().values().append(spreadsheetId=self.SPREADSHEET_BOSS_PARTIES,
-                                                            range=self.RANGE_MEMBERS, valueInputOption="USER_ENTERED",
-                                                            body=body).execute()
+        # Appended rather than written after the last known member, which could overwrite a row added in Sheets since
+        sheets.enqueue(self.SPREADSHEET_BOSS_PARTIES, 'append',
+                       {'range': self.RANGE_MEMBERS, 'valueInputOption': 'USER_ENTERED',
+                        'values': list(map(member_to_sheets_values, new_sheets_members))})
 
         self.__members += new_sheets_members
         for new_sheets_member in new_sheets_members:
             self.__parties_dict[new_sheets_member.party_role_id].members.append(new_sheets_member)
+        self.__save_members()
 
-    def update_member(self, updated_sheets_member: Member):
+    async def update_member(self, updated_sheets_member: Member):
         update_index = 2
         for sheets_member in self.__members:
             if sheets_member.user_id == updated_sheets_member.user_id and sheets_member.party_role_id == updated_sheets_member.party_role_id and (
@@ -468,44 +604,39 @@ class BossingSheets:
             # Cannot find delete_member in sheets_members_list
             return
 
-        try:
-            body = {'values': [updated_sheets_member.to_sheets_value()]}
-            sheets.get_service().spreadsheets().values().update(spreadsheetId=self.SPREADSHEET_BOSS_PARTIES,
-                                                                range=f'Members!A{update_index}:E{update_index}',
-                                                                valueInputOption="USER_ENTERED",
-                                                                body=body).execute()
-            return updated_sheets_member
-
-        except HttpError as error:
-            print(f"An error occurred: {error}")
-            raise error
-
-    def delete_member(self, delete_sheets_member: Member):
-        delete_index = 0
-        for sheets_member in self.__members:
-            if sheets_member.user_id == delete_sheets_member.user_id and sheets_member.party_role_id == delete_sheets_member.party_role_id and (
-                    not delete_sheets_member.job or sheets_member.job == delete_sheets_member.job):
-                # Found the entry
-                break
-            delete_index += 1
-
-        if delete_index >= len(self.__members):
-            # Cannot find delete_member in sheets_members_list
-            return
-
-        delete_body = {"requests": [{"deleteDimension": {
-            "range": {"sheetId": self.SHEET_BOSS_PARTIES_MEMBERS, "dimension": "ROWS", "startIndex": delete_index + 1,
-                      # Due to header row
-                      "endIndex": delete_index + 2}}}]}
-        try:
-            sheets.get_service().spreadsheets().batchUpdate(spreadsheetId=self.SPREADSHEET_BOSS_PARTIES,
-                                                            body=delete_body).execute()
+        self.__write_queue.update(f'Members!A{update_index}:E{update_index}',
+                                  [updated_sheets_member.to_sheets_value()])
+        self.__save_members()
+        return updated_sheets_member
+
+    async def delete_member(self, delete_sheets_member: Member):
+        async with self.__lock:
+            delete_index = 0
+            for sheets_member in self.__members:
+                if sheets_member.user_id == delete_sheets_member.user_id and sheets_member.party_role_id == delete_sheets_member.party_role_id and (
+                        not delete_sheets_member.job or sheets_member.job == delete_sheets_member.job):
+                    # Found the entry
+                    break
+                delete_index += 1
+
+            if delete_index >= len(self.__members):
+                # Cannot find delete_member in sheets_members_list
+                return
+
+            # Queued writes target row numbers from before the delete
+            await self.__write_queue.flush()
+            delete_body = {"requests": [{"deleteDimension": {
+                "range": {"sheetId": self.SHEET_BOSS_PARTIES_MEMBERS, "dimension": "ROWS", "startIndex": delete_index + 1,
+                          # Due to header row
+                          "endIndex": delete_index + 2}}}]}
+            sheets.enqueue(self.SPREADSHEET_BOSS_PARTIES, 'spreadsheet', delete_body)
 
             deleted_sheets_member = self.__members[delete_index]
             print(deleted_sheets_member)
 
             # Remove deleted member from members list
             self.__members = self.__members[0:delete_index] + self.__members[delete_index + 1:]
+            self.__save_members()
 
             # Remove deleted member from parties dict
             try:
@@ -519,15 +650,10 @@ class BossingSheets:
 
             return deleted_sheets_member
 
-        except HttpError as error:
-            print(f"An error occurred: {error}")
-            raise error
-
-    def append_no_shows(self, no_shows: list[NoShow]):
+    async def append_no_shows(self, no_shows: list[NoShow]):
         def no_show_to_sheets_values(no_show: NoShow):
             return no_show.to_sheets_value()
 
-        body = {'values': list(map(no_show_to_sheets_values, no_shows))}
-        sheets.get_service().spreadsheets().values().append(spreadsheetId=self.SPREADSHEET_BOSS_PARTIES,
-                                                            range=self.RANGE_NO_SHOWS, valueInputOption="USER_ENTERED",
-                                                            body=body).execute()
+        sheets.enqueue(self.SPREADSHEET_BOSS_PARTIES, 'append',
+                       {'range': self.RANGE_NO_SHOWS, 'valueInputOption': 'USER_ENTERED',
+                        'values': list(map(no_show_to_sheets_values, no_shows))})
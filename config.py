@@ -5,6 +5,16 @@
 # config.BOT_TOKEN = 'your_bot_token'
 
 TESSERACT_OCR_PATH = ''
+# Language data directory used when tesserocr is installed, empty for its default
+TESSERACT_TESSDATA_PATH = ''
+# Region of the guild contribution list in a screenshot, as (y1, y2, x1, x2)
+OCR_CROP = (130, 544, 205, 644)
+# Crop away the rows at the top of a screenshot that are already at the bottom of the previous one
+OCR_DEDUPE_ROWS = True
+# Read names in English first, and only read the names that do not match again in every language
+OCR_TWO_PASS = True
+# Directory to save the processed screenshots to for debugging, empty to not save them
+OCR_DEBUG_DIR = ''
 
 BOT_TOKEN = ''
 GROVE_BOT_USER_ID = ''
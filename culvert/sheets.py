@@ -29,24 +29,6 @@ class CulvertWeeks:
                             scores)
 
 
-def get_culvert_weeks_scores():
-    service = sheets.get_service()
-
-    dates_result = service.spreadsheets().values().get(spreadsheetId=SHEET_MEMBER_TRACKING,
-                                                       range=RANGE_CULVERT_WEEKS_DATES).execute()
-    dates = dates_result.get('values', [])[0]
-
-    scores_result = service.spreadsheets().values().get(spreadsheetId=SHEET_MEMBER_TRACKING,
-                                                        range=RANGE_CULVERT_WEEKS_SCORES).execute()
-    scores_values = scores_result.get('values', [])
-
-    if not scores_values:
-        print('No data found.')
-        return
-
-    return list(map(lambda culvert_value: CulvertWeeks.from_sheets_value(dates, culvert_value), scores_values))
-
-
 class CulvertMax:
     LENGTH = 2
 
@@ -63,15 +45,21 @@ class CulvertMax:
                           int(culvert_max_value[CulvertMax.INDEX_SCORE]))
 
 
-def get_culvert_max_scores():
-    service = sheets.get_service()
-
-    max_scores_result = service.spreadsheets().values().get(spreadsheetId=SHEET_MEMBER_TRACKING,
-                                                            range=RANGE_CULVERT_MAX_SCORES).execute()
-    culvert_max_values = max_scores_result.get('values', [])
+async def get_culvert_scores():
+    """Returns the all-time max scores and the recent weekly scores, read together in one request. Either list is empty
+    if its range has no data."""
+    max_values, dates_values, scores_values = await sheets.batch_get(SHEET_MEMBER_TRACKING,
+                                                                     [RANGE_CULVERT_MAX_SCORES,
+                                                                      RANGE_CULVERT_WEEKS_DATES,
+                                                                      RANGE_CULVERT_WEEKS_SCORES])
 
-    if not culvert_max_values:
+    # Either range can be empty on its own, e.g. before the first week is tracked, so each is returned as it is
+    if not max_values or not scores_values:
         print('No data found.')
-        return
 
-    return list(map(lambda culvert_max_value: CulvertMax.from_sheets_value(culvert_max_value), culvert_max_values))
+    dates = dates_values[0] if dates_values else []
+    culvert_max_scores = list(map(lambda culvert_max_value: CulvertMax.from_sheets_value(culvert_max_value),
+                                  max_values))
+    culvert_weeks_scores = list(map(lambda culvert_value: CulvertWeeks.from_sheets_value(dates, culvert_value),
+                                    scores_values))
+    return culvert_max_scores, culvert_weeks_scores
@@ -1,4 +1,10 @@
+import asyncio
 import datetime
+import hashlib
+import json
+import os.path
+import sys
+import time
 from functools import reduce
 
 import discord
@@ -7,27 +13,75 @@ from discord.ext import commands
 import config
 import grove_config
 from member import common
-from utils import version
+from utils import sheets, version
 
 grove_config.set_configs()
 MY_GUILD = discord.Object(id=config.GROVE_GUILD_ID)
+EXTENSIONS = ['member.cog', 'bossing.cog', 'absence.cog', 'birthday.cog', 'culvert.cog', 'messages.cog']
+# Hash of the command tree last synced to Discord
+COMMAND_TREE_HASH_PATH = 'command_tree.sha256'
+# Start with `python3 ./grovebot.py --force-sync` to sync the command tree even if it has not changed
+FORCE_SYNC = '--force-sync' in sys.argv
 
 
 class GroveBot(commands.Bot):
     def __init__(self, command_prefix, intents):
         super().__init__(command_prefix=command_prefix, intents=intents)
+        self.prefetch: sheets.Prefetch = None
+        self.reconciler: asyncio.Task = None
 
     async def setup_hook(self):
-        await self.load_extension('member.cog')
-        await self.load_extension('bossing.cog')
-        await self.load_extension('absence.cog')
-        await self.load_extension('birthday.cog')
-        await self.load_extension('culvert.cog')
-        await self.load_extension('messages.cog')
-        print('Cogs loaded.')
+        started_at = time.perf_counter()
+        # Imported here rather than at the top, as the sheets modules read config when they are imported
+        from absence.sheets import AbsenceSheets
+        from birthday.sheets import BirthdaySheets
+        from bossing.sheets import BossingSheets
+
+        # Sheets data read by several cogs during setup, fetched once per spreadsheet
+        self.prefetch = sheets.Prefetch({
+            config.BOSS_PARTIES_SPREADSHEET_ID: BossingSheets.RANGES,
+            config.MEMBER_ACTIVITY_SPREADSHEET_ID: [AbsenceSheets.RANGE_ABSENCES, BirthdaySheets.RANGE_BIRTHDAYS]})
+
+        # The cogs do not depend on each other during setup, so they are loaded concurrently
+        await asyncio.gather(*[self.__load_extension(extension) for extension in EXTENSIONS])
+        print(f'Cogs loaded in {time.perf_counter() - started_at:.3f}s.')
+        self.reconciler = asyncio.create_task(sheets.reconcile())
+
+        sync_started_at = time.perf_counter()
         self.tree.copy_global_to(guild=MY_GUILD)
+        if await self.sync_command_tree(force=FORCE_SYNC):
+            print(f'Command tree synced in {time.perf_counter() - sync_started_at:.3f}s.')
+        else:
+            print('Command tree unchanged, skipped sync.')
+        print(f'Setup complete in {time.perf_counter() - started_at:.3f}s.')
+
+    async def sync_command_tree(self, force=False):
+        """Syncs the command tree to Discord if it changed since the last sync, or if forced.
+
+        Returns whether it was synced. Syncs are rate limited by Discord, so restarts without command changes skip it.
+        """
+        commands_dicts = [command.to_dict(self.tree) for command in self.tree.get_commands(guild=MY_GUILD)]
+        tree_hash = hashlib.sha256(json.dumps([MY_GUILD.id, commands_dicts], sort_keys=True).encode()).hexdigest()
+
+        if not force and os.path.exists(COMMAND_TREE_HASH_PATH):
+            with open(COMMAND_TREE_HASH_PATH) as hash_file:
+                if hash_file.read().strip() == tree_hash:
+                    return False
+
         await self.tree.sync(guild=MY_GUILD)
-        print('Command tree synced.')
+        with open(COMMAND_TREE_HASH_PATH, 'w') as hash_file:
+            hash_file.write(tree_hash)
+        return True
+
+    async def __load_extension(self, extension: str):
+        started_at = time.perf_counter()
+        await self.load_extension(extension)
+        print(f'Loaded {extension} in {time.perf_counter() - started_at:.3f}s.')
+
+    async def close(self):
+        # Send any queued Sheets writes before shutting down
+        await sheets.flush_all()
+        await super().close()
 
 
 grove_bot_intents = discord.Intents.default()
@@ -43,6 +97,12 @@ async def on_ready():
     print('------')
 
 
+@grove_bot.event
+async def on_app_command_completion(interaction: discord.Interaction, command):
+    # Send the Sheets writes queued by the command now rather than waiting for the debounce
+    await sheets.flush_all()
+
+
 @grove_bot.command(name='version')
 async def _version(ctx):
     await ctx.send(version.version_name)
@@ -76,4 +136,18 @@ async def thursday(ctx):
     await ctx.send(message)
 
 
+@grove_bot.command(name='sync-commands')
+@commands.has_role(config.GROVE_ROLE_ID_JUNIOR)
+async def sync_commands(ctx):
+    await grove_bot.sync_command_tree(force=True)
+    await ctx.send('Command tree synced.')
+
+
+@grove_bot.command(name='sheets-stats')
+@commands.has_role(config.GROVE_ROLE_ID_JUNIOR)
+async def sheets_stats(ctx):
+    await ctx.send(f'```\n{sheets.stats}\n\n{sheets.usage}\n\n'
+                   f'This minute: {sheets.usage.requests_this_minute()}/{sheets.RATE_LIMIT_PER_MINUTE} requests\n```')
+
+
 grove_bot.run(config.BOT_TOKEN)
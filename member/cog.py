@@ -71,6 +71,7 @@ class MemberCog(commands.Cog):
             message_id_list = list(map(lambda message_id: int(message_id), message_ids.split(',')))
         except ValueError:
             await interaction.followup.send('Error - Invalid message IDs.')
+            return
         await track.track_grove(interaction, message_id_list)
 
     @app_commands.command(name='mod-track-shrub', description='Track Shrub weekly Culvert and Flag Race')
@@ -82,8 +83,21 @@ class MemberCog(commands.Cog):
             message_id_list = list(map(lambda message_id: int(message_id), message_ids.split(',')))
         except ValueError:
             await interaction.followup.send('Error - Invalid message IDs.')
+            return
         await track.track_shrub(interaction, message_id_list)
 
+    @app_commands.command(name='mod-track-all', description='Track Grove and Shrub weekly Culvert and Flag Race')
+    @app_commands.checks.has_role(config.GROVE_ROLE_ID_JUNIOR)
+    @app_commands.describe(message_ids='IDs of the messages with the attached screenshots, separated with commas.')
+    async def track_all(self, interaction, message_ids: str):
+        await interaction.response.defer()
+        try:
+            message_id_list = list(map(lambda message_id: int(message_id), message_ids.split(',')))
+        except ValueError:
+            await interaction.followup.send('Error - Invalid message IDs.')
+            return
+        await track.track_all(interaction, message_id_list)
+
     @app_commands.command(name='mod-audit', description='Audit Discord server members')
     @app_commands.checks.has_role(config.GROVE_ROLE_ID_JUNIOR)
     async def audit(self, interaction):
@@ -1,10 +1,114 @@
+import asyncio
+import os
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime
+from typing import AsyncIterator, Awaitable, Union
+
 import cv2
-import discord
 import numpy as np
-from fuzzywuzzy import process
 from pytesseract import pytesseract
 
 import config
+from member import ocr_cache
+from member.matcher import IgnMatcher, assign
+
+try:
+    import tesserocr
+except ImportError:
+    # Optional, OCR falls back to pytesseract
+    tesserocr = None
+
+# Screenshots are processed in parallel, one per core
+MAX_OCR_WORKERS = os.cpu_count()
+OCR_LANGUAGES = 'eng+ces+fra+spa'
+# Languages of the first pass of two pass OCR, IGNs it cannot read are read again with OCR_LANGUAGES
+OCR_FAST_LANGUAGES = 'eng'
+# Tesseract page segmentation modes
+PSM_SINGLE_BLOCK = 6
+PSM_SINGLE_LINE = 7
+# Screenshots are scaled up by this much before OCR
+SCALE = 5
+# Row finding, in pixels of the scaled up image. Blank gaps narrower than this are inside a row.
+MIN_ROW_GAP = 10
+MIN_ROW_HEIGHT = 25
+# Blank space kept above and below a row that is read again on its own
+LINE_PADDING = 10
+# Rows are compared between consecutive screenshots by a signature of how much of each cell of this grid is text
+ROW_SIGNATURE_WIDTH = 256
+ROW_SIGNATURE_HEIGHT = 8
+# Rows whose signatures differ by at most this much on average are the same row
+ROW_SIGNATURE_MAX_DIFFERENCE = 0.028
+# Fewer rows than this matching between screenshots is not taken as an overlap, as a single row can match by chance
+MIN_OVERLAP_ROWS = 2
+
+_executor: ProcessPoolExecutor = None
+
+
+class PytesseractBackend:
+    """Runs the tesseract binary for each image, which loads the language data every time."""
+
+    def __init__(self, tesseract_cmd: str):
+        pytesseract.tesseract_cmd = tesseract_cmd
+
+    def image_to_string(self, img: np.ndarray, psm: int, languages: str):
+        return pytesseract.image_to_string(img, config=f'--psm {psm} -l {languages}')
+
+
+class TesserocrBackend:
+    """Keeps a Tesseract engine loaded for each set of languages, through the Tesseract C API."""
+
+    def __init__(self, tessdata_path: str, two_pass: bool):
+        self.tessdata_path = tessdata_path
+        self.__apis: dict[str, tesserocr.PyTessBaseAPI] = {}
+        # Load the default languages up front, so the first screenshot does not wait for them
+        self.__get_api(OCR_FAST_LANGUAGES if two_pass else OCR_LANGUAGES)
+
+    def __get_api(self, languages: str):
+        api = self.__apis.get(languages)
+        if api is None:
+            if self.tessdata_path:
+                api = tesserocr.PyTessBaseAPI(path=self.tessdata_path, lang=languages)
+            else:
+                api = tesserocr.PyTessBaseAPI(lang=languages)
+            self.__apis[languages] = api
+        return api
+
+    def image_to_string(self, img: np.ndarray, psm: int, languages: str):
+        api = self.__get_api(languages)
+        api.SetPageSegMode(psm)
+        # Grayscale image, one byte per pixel
+        height, width = img.shape
+        api.SetImageBytes(img.tobytes(), width, height, 1, width)
+        return api.GetUTF8Text()
+
+
+# OCR backend of this worker process, created by the pool initializer
+_backend = None
+# Writes debug images in the background of a worker process, so encoding them does not hold up OCR
+_debug_writer: ThreadPoolExecutor = None
+
+
+class OcrPassStats:
+    """Time spent in each pass of two pass OCR, and how many lines the second pass read again and recovered."""
+
+    def __init__(self):
+        self.first_pass_seconds = 0
+        self.second_pass_seconds = 0
+        self.reread = 0
+        self.recovered = 0
+
+    def add(self, other):
+        self.first_pass_seconds += other.first_pass_seconds
+        self.second_pass_seconds += other.second_pass_seconds
+        self.reread += other.reread
+        self.recovered += other.recovered
+
+    def __str__(self):
+        return (f'first pass {self.first_pass_seconds:.2f}s, second pass {self.second_pass_seconds:.2f}s, '
+                f'{self.recovered}/{self.reread} lines recovered')
 
 
 class Result:
@@ -21,112 +125,373 @@ class Result:
             raise ValueError
         self.flag = int(data[-1])
         self.data = data
+        self.guild = None
 
     def raw_ign(self):
         return self.data[0]
 
 
-async def extract(interaction: discord.Interaction, list_of_igns: list[str], custom_ign_map: dict[str, str],
-                  byte_images: list[bytes]) -> (
-        list[Result], list[list[str]]):
-    path_to_tesseract = config.TESSERACT_OCR_PATH
-    pytesseract.tesseract_cmd = path_to_tesseract
-    text = ""
-    i = 0
+def _get_executor():
+    global _executor
+    if _executor is None:
+        # Worker processes do not share this process's config overrides, so they are passed in
+        _executor = ProcessPoolExecutor(max_workers=MAX_OCR_WORKERS, initializer=_init_worker,
+                                        initargs=(config.TESSERACT_OCR_PATH, config.TESSERACT_TESSDATA_PATH,
+                                                  config.OCR_TWO_PASS))
+    return _executor
+
+
+def _init_worker(tesseract_cmd: str, tessdata_path: str, two_pass: bool):
+    global _backend
+    if tesserocr is not None:
+        try:
+            _backend = TesserocrBackend(tessdata_path, two_pass)
+            return
+        except RuntimeError as error:
+            print(f'Failed to load tesserocr, falling back to pytesseract: {error}')
+    _backend = PytesseractBackend(tesseract_cmd)
+
+
+def _ocr_settings():
+    """Settings that change the text read from a screenshot, part of its OCR cache key."""
+    backend = 'tesserocr' if tesserocr is not None else 'pytesseract'
+    return repr([backend, OCR_LANGUAGES, OCR_FAST_LANGUAGES, config.OCR_TWO_PASS, config.OCR_CROP, SCALE,
+                 MIN_ROW_GAP, MIN_ROW_HEIGHT, LINE_PADDING])
+
+
+def _write_debug_image(path: str, img: np.ndarray):
+    global _debug_writer
+    if _debug_writer is None:
+        _debug_writer = ThreadPoolExecutor(max_workers=1)
+    _debug_writer.submit(cv2.imwrite, path, img)
+
+
+def _extract_text(byte_image: bytes, crop: tuple[int, int, int, int], debug_path: str = '',
+                  matcher: IgnMatcher = None, skip_rows: int = 0) -> (str, OcrPassStats):
+    """Processes one screenshot to make it easier to parse, and returns its text. Runs in a worker process.
+
+    The first skip_rows rows are cropped away, e.g. the ones already in the previous screenshot. The processed image is
+    saved to debug_path if it is given. See _read_text for the matcher.
+    """
+    img = _preprocess(_decode(byte_image), crop)
+    if skip_rows > 0:
+        rows = _find_rows(img)
+        if skip_rows >= len(rows):
+            return '', OcrPassStats()
+        # Crop halfway between the last skipped row and the first kept one
+        img = img[(rows[skip_rows - 1][1] + rows[skip_rows][0]) // 2:]
+    if debug_path:
+        _write_debug_image(debug_path, img)
+    return _read_text(img, matcher)
+
+
+def _decode(byte_image: bytes) -> np.ndarray:
+    return cv2.imdecode(np.frombuffer(byte_image, dtype=np.uint8), cv2.IMREAD_COLOR)
+
+
+def _preprocess(img: np.ndarray, crop: tuple[int, int, int, int]) -> np.ndarray:
+    # Crop image [y1:y2,x1:x2]
+    y1, y2, x1, x2 = crop
+    img = img[y1:y2, x1:x2]
+    # Resizing and making the images bigger
+    img = cv2.resize(img, None, fx=SCALE, fy=SCALE)
+    img = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    # Applying Gaussian blur
+    img = cv2.GaussianBlur(img, (3, 3), 0)
+    # Using Otsu thresholding to binarize, partitions image into foreground
+    # and background
+    retval, img = cv2.threshold(img, 0, 255, cv2.THRESH_BINARY_INV | cv2.THRESH_OTSU)
+    # Applying erosion
+    kernel = np.ones((3, 3), np.uint8)
+    return cv2.erode(img, kernel, iterations=1)
+
+
+def _read_text(img: np.ndarray, matcher: IgnMatcher = None) -> (str, OcrPassStats):
+    """Reads the text of a processed screenshot.
+
+    Given a matcher, the text is read in two passes. The first reads in English only, and the second reads the lines
+    that cannot be parsed or matched again in every language.
+    """
+    stats = OcrPassStats()
+    started_at = time.perf_counter()
+    # Extract text from the images, I found psm 6 to be the best at parsing
+    # the columns and putting the data into rows
+    languages = OCR_FAST_LANGUAGES if matcher is not None else OCR_LANGUAGES
+    text = _backend.image_to_string(img, PSM_SINGLE_BLOCK, languages)
+    stats.first_pass_seconds = time.perf_counter() - started_at
+    if matcher is None or languages == OCR_LANGUAGES:
+        return text, stats
+
+    lines = [line for line in text.splitlines() if line.strip()]
+    unmatched = [x for x, line in enumerate(lines) if not _is_matched(matcher, line)]
+    if not unmatched:
+        return text, stats
+
+    started_at = time.perf_counter()
+    rows = _find_rows(img)
+    stats.reread = len(unmatched)
+    if len(rows) == len(lines):
+        # Each line is one row of the list, so only the unmatched rows are read again
+        for x in unmatched:
+            line = _ocr_line(img, rows[x], OCR_LANGUAGES)
+            if _is_matched(matcher, line):
+                lines[x] = line
+                stats.recovered += 1
+        text = '\n'.join(lines) + '\n'
+    else:
+        # The lines cannot be lined up with the rows, so the whole list is read again
+        text = _backend.image_to_string(img, PSM_SINGLE_BLOCK, OCR_LANGUAGES)
+        matched_count = sum(_is_matched(matcher, line) for line in text.splitlines() if line.strip())
+        stats.recovered = max(matched_count - (len(lines) - len(unmatched)), 0)
+    stats.second_pass_seconds = time.perf_counter() - started_at
+    return text, stats
+
+
+def _ocr_line(img: np.ndarray, row: tuple[int, int], languages: str) -> str:
+    """Reads one row of the list as a single line."""
+    return _backend.image_to_string(img[max(row[0] - LINE_PADDING, 0):min(row[1] + LINE_PADDING, img.shape[0])],
+                                    PSM_SINGLE_LINE, languages).strip()
+
+
+def _is_matched(matcher: IgnMatcher, line: str):
+    """Whether a line parses into a row with valid numbers and an IGN that matches the roster."""
+    rows = parse_rows(line)
+    if not rows:
+        return False
+    try:
+        Result(rows[0][0], 0, rows[0])
+    except ValueError:
+        return False
+    return bool(matcher.candidates(matcher.custom_ign_fix(rows[0][0])))
+
+
+def _find_bands(profile: np.ndarray, min_gap: int, min_size: int = 1) -> list[tuple[int, int]]:
+    """Returns the (start, end) of each run of non-zero values in a projection profile.
+
+    Runs separated by fewer than min_gap zeros are merged, and runs shorter than min_size are dropped.
+    """
+    bands = []
+    for position in np.flatnonzero(profile):
+        if bands and position - bands[-1][1] <= min_gap:
+            bands[-1][1] = position + 1
+        else:
+            bands.append([position, position + 1])
+    return [(start, end) for start, end in bands if end - start >= min_size]
+
+
+def _ink(img: np.ndarray) -> np.ndarray:
+    # Text is whichever of black and white covers less of the image
+    return img == 0 if np.count_nonzero(img == 0) < img.size / 2 else img == 255
+
+
+def _find_rows(img: np.ndarray) -> list[tuple[int, int]]:
+    return _find_bands(_ink(img).sum(axis=1), MIN_ROW_GAP, MIN_ROW_HEIGHT)
+
+
+def _row_signatures(byte_image: bytes, crop: tuple[int, int, int, int]) -> list[np.ndarray]:
+    """Returns a signature of each row of a screenshot, from top to bottom."""
+    img = _preprocess(_decode(byte_image), crop)
+    ink = _ink(img).astype(np.float32)
+    return [cv2.resize(ink[row[0]:row[1]], (ROW_SIGNATURE_WIDTH, ROW_SIGNATURE_HEIGHT), interpolation=cv2.INTER_AREA)
+            for row in _find_rows(img)]
+
+
+def _overlapping_rows(previous_signatures: list[np.ndarray], signatures: list[np.ndarray]) -> int:
+    """Returns how many rows at the top of a screenshot are also at the bottom of the previous one.
+
+    The row at the edge of either screenshot may be cut off, so the overlap may start at the second row of the
+    screenshot and end at the second to last row of the previous one. The cut off row is counted as overlapping too.
+    """
+    def same_row(signature_a: np.ndarray, signature_b: np.ndarray):
+        return np.abs(signature_a - signature_b).mean() <= ROW_SIGNATURE_MAX_DIFFERENCE
+
+    overlap = 0
+    for start in range(min(2, len(signatures))):
+        for end in (len(previous_signatures), len(previous_signatures) - 1):
+            for count in range(min(end, len(signatures) - start), MIN_OVERLAP_ROWS - 1, -1):
+                if all(same_row(previous_signatures[end - count + j], signatures[start + j]) for j in range(count)):
+                    overlap = max(overlap, start + count)
+                    break
+    return overlap
+
+
+class ScreenshotResult:
+    """The rows read from one screenshot, yielded by extract as soon as the screenshot is read."""
+
+    def __init__(self, index: int, guild: str, rows: list[tuple[str, list[str], dict[int, int]]],
+                 errors: list[list[str]], previously_read: bool):
+        self.index = index
+        self.guild = guild
+        # The IGN, row and guild candidates of each row that can be matched
+        self.rows = rows
+        self.errors = errors
+        self.previously_read = previously_read
+
+
+class MatchResult:
+    """The rows of every screenshot matched to the roster IGNs, yielded by extract after the last screenshot."""
+
+    def __init__(self, results: list[Result], errors: list[list[str]]):
+        self.results = results
+        self.errors = errors
+
+
+async def extract(list_of_igns: list[str], ign_guilds: list[str], custom_ign_map: dict[str, str],
+                  byte_images: list[Awaitable[bytes]]) -> AsyncIterator[Union[ScreenshotResult, MatchResult]]:
+    """Reads the guild contribution rows from screenshots and matches them to the list of IGNs. Yields a
+    ScreenshotResult for each screenshot as soon as it is read, then a MatchResult with the matches of every row.
+
+    Takes the screenshots as awaitables, e.g. download tasks, so each screenshot is processed as soon as it is
+    downloaded rather than after all of them. ign_guilds is the guild of each IGN. Each screenshot is tagged with the
+    guild most of its rows match, and its rows are only matched to that guild's IGNs. Each error has its guild after
+    the error type.
+
+    Screenshots are yielded in the order they are given, while later ones are still being read. Each IGN can only be
+    matched to one row, so the rows of every screenshot are matched together once all of them are read, as a row of a
+    later screenshot can be the better match for an IGN.
+    """
+    debug_paths = [''] * len(byte_images)
+    if config.OCR_DEBUG_DIR:
+        os.makedirs(config.OCR_DEBUG_DIR, exist_ok=True)
+        # Unique names per run, so overlapping runs do not overwrite each other's images
+        run_id = f'{datetime.now().strftime("%Y%m%d-%H%M%S")}-{uuid.uuid4().hex[:8]}'
+        debug_paths = [os.path.join(config.OCR_DEBUG_DIR, f'{run_id}-{i}.png') for i in range(len(byte_images))]
+
+    settings = _ocr_settings()
+    loop = asyncio.get_running_loop()
+    matcher = IgnMatcher(list_of_igns, custom_ign_map)
+    # Two pass OCR needs the matcher in the worker to tell which IGNs to read again. The cache holds the text read
+    # after both passes, so a screenshot read against one roster is not read again for another.
+    worker_matcher = matcher if config.OCR_TWO_PASS else None
+    pass_stats = OcrPassStats()
+    skipped_rows = [0] * len(byte_images)
+
+    # Each screenshot is awaited more than once, by its row signatures and by its OCR
+    downloads = [asyncio.ensure_future(byte_image) for byte_image in byte_images]
+
+    async def sign_rows(i: int):
+        # Cheap next to OCR, so run in a thread rather than waiting behind OCR in the worker processes
+        return await loop.run_in_executor(None, _row_signatures, await downloads[i], config.OCR_CROP)
+
+    row_signatures = []
+    if config.OCR_DEDUPE_ROWS:
+        row_signatures = [asyncio.ensure_future(sign_rows(i)) for i in range(len(byte_images))]
+
+    async def read(i: int):
+        byte_image = await downloads[i]
+        if row_signatures and i > 0:
+            # Scrolling screenshots overlap, so rows already in the previous screenshot are cropped away
+            skipped_rows[i] = _overlapping_rows(await row_signatures[i - 1], await row_signatures[i])
+
+        # Screenshots that were already read with the same settings, e.g. on a re-run, are not read again
+        cache_key = ocr_cache.key(byte_image, f'{settings} {skipped_rows[i]}')
+        cached_ocr = ocr_cache.get(cache_key)
+        if cached_ocr is not None:
+            return i, cached_ocr, True
+
+        text, stats = await loop.run_in_executor(_get_executor(), _extract_text, byte_image, config.OCR_CROP,
+                                                 debug_paths[i], worker_matcher, skipped_rows[i])
+        pass_stats.add(stats)
+        cached_ocr = ocr_cache.CachedOcr(text, parse_rows(text))
+        ocr_cache.put(cache_key, cached_ocr)
+        return i, cached_ocr, False
+
     # Iterating through every screenshot that was taken and performing
-    # image processing to make the images easier to parse
-    for byte_image in byte_images:
-        img = cv2.imdecode(np.frombuffer(byte_image, dtype=np.uint8), cv2.IMREAD_COLOR)
-        # Crop image [y1:y2,x1:x2]
-        img = img[130:544, 205:644]
-        # Resizing and making the images bigger
-        img = cv2.resize(img, None, fx=5, fy=5)
-        img = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-        # Applying Gaussian blur
-        img = cv2.GaussianBlur(img, (3, 3), 0)
-        # Using Otsu thresholding to binarize, partitions image into foreground
-        # and background
-        retval, img = cv2.threshold(img, 0, 255, cv2.THRESH_BINARY_INV | cv2.THRESH_OTSU)
-        # Applying erosion
-        kernel = np.ones((3, 3), np.uint8)
-        img = cv2.erode(img, kernel, iterations=1)
-        cv2.imwrite('tmp/extracted/processed' + str(i) + '.png', img)
-        i += 1
-        # Extract text from the images and put it all into one string,
-        # I found psm 6 to be the best at parsing the columns and
-        # putting the data into rows
-        text += pytesseract.image_to_string(img, config='--psm 6 -l eng+ces+fra+spa') + "\n"
-        await interaction.followup.send(f'Extracted image {i}')
-
-    # Formatting to prepare to extract data
-    data = text.splitlines()
-
-    # Remove empty entries
-    data = list(filter(None, data))
+    # image processing and OCR on them in parallel
+    tasks = [asyncio.ensure_future(read(i)) for i in range(len(byte_images))]
+    screenshots = []
+    for task in tasks:
+        i, cached_ocr, previously_read = await task
+        screenshot = _read_screenshot(i, cached_ocr.rows, matcher, ign_guilds, previously_read)
+        screenshots.append(screenshot)
+        yield screenshot
+    print(f'OCR: {pass_stats}, {sum(skipped_rows)} rows overlapping the previous screenshot cropped')
+    yield _match_screenshots(screenshots, matcher)
 
-    results = []
+
+def _read_screenshot(i: int, data: list[list[str]], matcher: IgnMatcher, ign_guilds: list[str],
+                     previously_read: bool) -> ScreenshotResult:
+    """Finds the roster IGNs of its guild each row of one screenshot can be matched to."""
     errors = []
 
-    # Extracts IGN, Culvert, and Flag Race numbers and compares parsed
-    # IGN to the list of IGNs in the guild and finds the most similar match
+    # Compares parsed IGN to the list of IGNs in the guild and finds every match of at least 70%
+    igns = []
+    rows = []
+    rows_candidates = []
     for x in range(0, len(data)):
-        data[x] = data[x].replace(',', '')
-        data[x] = data[x].replace('.', '')
-        data[x] = data[x].replace('1]', '0')
-        data[x] = data[x].replace('1}', '0')
-        data[x] = data[x].split()
-        if len(data[x]) < 4:
-            continue
-        data[x][-1] = data[x][-1].replace('O', '0').replace('g', '9')
-        data[x][-2] = data[x][-2].replace('O', '0').replace('g', '9')
-        data[x][-3] = data[x][-3].replace('O', '0').replace('g', '9')
-        ign = custom_ign_fixes(data[x][0], custom_ign_map)
-        match, percent = process.extractOne(ign, list_of_igns)
-
-        # IGNs match by 70%, if not then send to errors
-        if percent >= 70:
-            try:
-                result = Result(match, percent, data[x])
-                results.append(result)
-            except ValueError:
-                # Couldn't convert string to int
-                errors.append(['ValueError', data[x][-3], data[x][-2], data[x][-1], ign, percent])
-        else:
+        ign = matcher.custom_ign_fix(data[x][0])
+        candidates = matcher.candidates(ign)
+        if not candidates:
             # IGN couldn't be matched
-            errors.append(['Match error', data[x][-3], data[x][-2], data[x][-1], ign, percent])
-
-    def sort_key(result: Result):
-        return result.matched_percent
-
-    results = sorted(results, key=sort_key, reverse=True)
-
-    for result in results:
-        if result.matched_ign not in list_of_igns:
-            # A better match was already made with this IGN
-            results.remove(result)
-            match, percent = process.extractOne(result.raw_ign(), list_of_igns)
-            if percent >= 70:
-                try:
-                    new_result = Result(match, percent, result.data)
-                    results.append(new_result)
-                except ValueError:
-                    # Couldn't convert string to int
-                    errors.append(
-                        ['ValueError', result.weekly_mission, result.culvert, result.flag, result.raw_ign(),
-                         percent])
-            else:
-                errors.append(
-                    ['Duplicate error', result.weekly_mission, result.culvert, result.flag, result.raw_ign(),
-                     percent])
-        else:
-            list_of_igns.remove(result.matched_ign)
+            errors.append(['Match error', data[x][-3], data[x][-2], data[x][-1], ign, matcher.match(ign)[1]])
+            continue
+        try:
+            Result(ign, 0, data[x])
+        except ValueError:
+            # Couldn't convert string to int
+            errors.append(['ValueError', data[x][-3], data[x][-2], data[x][-1], ign, max(candidates.values())])
+            continue
+        igns.append(ign)
+        rows.append(data[x])
+        rows_candidates.append(candidates)
 
-    return results, errors
+    # The screenshot is of one guild's list, so tag it with the guild most of its rows best match
+    guild_counts = Counter(ign_guilds[max(candidates, key=candidates.get)] for candidates in rows_candidates)
+    guild = guild_counts.most_common(1)[0][0] if guild_counts else (ign_guilds[0] if ign_guilds else '')
 
+    for x in range(len(rows)):
+        guild_candidates = {j: candidate_score for j, candidate_score in rows_candidates[x].items()
+                            if ign_guilds[j] == guild}
+        if not guild_candidates:
+            # Only matches IGNs of another guild
+            j = max(rows_candidates[x], key=rows_candidates[x].get)
+            errors.append(['Guild error', rows[x][-3], rows[x][-2], rows[x][-1], igns[x], rows_candidates[x][j],
+                           f'Matched {matcher.igns[j]} in {ign_guilds[j]}'])
+        rows_candidates[x] = guild_candidates
 
-def custom_ign_fixes(ign: str, custom_ign_map: dict[str, str]):
-    match, percent = process.extractOne(ign, custom_ign_map.keys())
-    if percent == 100:
-        return custom_ign_map[match]
-    else:
-        return ign
+    rows = [(ign, row, candidates) for ign, row, candidates in zip(igns, rows, rows_candidates) if candidates]
+    return ScreenshotResult(i, guild, rows, [[error[0], guild] + error[1:] for error in errors], previously_read)
+
+
+def _match_screenshots(screenshots: list[ScreenshotResult], matcher: IgnMatcher) -> MatchResult:
+    """Matches the rows of every screenshot to the roster IGNs, with the best assignment over all of them."""
+    results = []
+    errors = []
+    rows = [(screenshot.guild, ign, row, candidates) for screenshot in screenshots
+            for ign, row, candidates in screenshot.rows]
+    # Each IGN can only be matched to one row, so find the best matching of all rows at once
+    assignment = assign([candidates for guild, ign, row, candidates in rows])
+    for (guild, ign, row, candidates), j in zip(rows, assignment):
+        if j is None:
+            # Every IGN this row matches was a better match for another row
+            errors.append(['Duplicate error', guild, row[-3], row[-2], row[-1], ign, max(candidates.values())])
+            continue
+
+        result = Result(matcher.igns[j], candidates[j], row)
+        result.guild = guild
+        results.append(result)
+        if sum(candidate_score == candidates[j] for candidate_score in candidates.values()) > 1:
+            # Also matches another IGN just as well, so the match should be checked
+            tied_igns = [matcher.igns[k] for k, candidate_score in candidates.items()
+                         if candidate_score == candidates[j] and k != j]
+            errors.append(['Ambiguous match', guild, row[-3], row[-2], row[-1], ign, candidates[j],
+                           f'Matched {matcher.igns[j]}, also {", ".join(tied_igns)}'])
+    return MatchResult(results, errors)
+
+
+def parse_rows(text: str) -> list[list[str]]:
+    """Extracts the IGN, Culvert, and Flag Race numbers of each line of OCR text."""
+    rows = []
+    for line in filter(None, text.splitlines()):
+        line = line.replace(',', '')
+        line = line.replace('.', '')
+        line = line.replace('1]', '0')
+        line = line.replace('1}', '0')
+        row = line.split()
+        if len(row) < 4:
+            continue
+        row[-1] = row[-1].replace('O', '0').replace('g', '9')
+        row[-2] = row[-2].replace('O', '0').replace('g', '9')
+        row[-3] = row[-3].replace('O', '0').replace('g', '9')
+        rows.append(row)
+    return rows
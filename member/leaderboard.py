@@ -49,7 +49,7 @@ async def send_leaderboard(bot: commands.Bot, interaction: discord.Interaction,
             await button_interaction.response.edit_message(view=None)
 
             # Validate the spreadsheet has a column for this week's announcement
-            if not sheets_members.is_valid(guild_week, thursday.strftime('%Y-%m-%d')):
+            if not await sheets_members.is_valid(guild_week, thursday.strftime('%Y-%m-%d')):
                 await interaction.followup.send(
                     'Error - unable to find the member tracking data for this week\'s announcement. Announcement has been cancelled.')
                 return
@@ -60,7 +60,7 @@ async def send_leaderboard(bot: commands.Bot, interaction: discord.Interaction,
             spirit_promotions = []
             tree_promotions = []
             left_discord = []
-            pre_promotions_mp_list = sheets_members.get_sorted_member_participation()
+            pre_promotions_mp_list = await sheets_members.get_sorted_member_participation()
             for mp in pre_promotions_mp_list:
                 if ((mp.rank == sheets_members.ROLE_NAME_TREE or mp.rank == sheets_members.ROLE_NAME_SAPLING)
                         and mp.contribution == sheets_members.CONTRIBUTION_THRESHOLD_SPIRIT and mp.ten_week_average >= sheets_members.AVERAGE_THRESHOLD_SPIRIT):
@@ -105,7 +105,7 @@ async def send_leaderboard(bot: commands.Bot, interaction: discord.Interaction,
             old_celestials = celestial_role.members
 
             # This week's Celestials
-            mp_list = sheets_members.get_sorted_member_participation()
+            mp_list = await sheets_members.get_sorted_member_participation()
             new_celestials = _get_celestials(mp_list)
             shrub_promotions = []
             moss_demotions = []
@@ -148,7 +148,7 @@ async def send_leaderboard(bot: commands.Bot, interaction: discord.Interaction,
             announcement_body = f'Thanks everyone for another great week of Grove! Here\'s our week {guild_week} recap:\n<#LEADERBOARD_THREAD_ID_HERE>\n\n'
 
             # New members
-            new_members = sheets_members.get_new_members()
+            new_members = await sheets_members.get_new_members()
             if len(new_members) == 0:
                 pass
             elif len(new_members) == 1:
@@ -179,7 +179,7 @@ async def send_leaderboard(bot: commands.Bot, interaction: discord.Interaction,
             await _announce_leaderboard(leaderboard_thread, leaderboard_thread_title, mp_list)
 
             # Set the new members as introed
-            sheets_members.update_introed_new_members()
+            await sheets_members.update_introed_new_members()
 
             await interaction.followup.send("Announcement complete!")
 
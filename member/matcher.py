@@ -0,0 +1,215 @@
+import re
+from collections import Counter
+
+try:
+    # C implementation of the same scorers as fuzzywuzzy
+    from rapidfuzz import fuzz, process
+except ImportError:
+    from fuzzywuzzy import fuzz, process
+
+    rapidfuzz = False
+else:
+    rapidfuzz = True
+
+try:
+    from scipy.optimize import linear_sum_assignment
+except ImportError:
+    # Optional, assignment falls back to a pure Python Hungarian algorithm
+    linear_sum_assignment = None
+
+# Candidates from the trigram index that are scored before falling back to scoring the whole roster
+MAX_CANDIDATES = 10
+# A candidate scoring at least this is taken without scoring the whole roster
+CANDIDATE_ACCEPT_SCORE = 90
+# IGNs must match by at least this percentage
+MATCH_THRESHOLD = 70
+
+
+def process_ign(ign: str):
+    """Normalises an IGN the same way fuzzywuzzy does before scoring: ASCII only, lower case, no symbols."""
+    ign = ''.join(character for character in ign if ord(character) < 128)
+    return re.sub(r'\W', ' ', ign).lower().strip()
+
+
+def score(processed_ign: str, processed_choice: str) -> int:
+    """fuzz.WRatio of two processed IGNs, as an int like fuzzywuzzy's process.extractOne."""
+    if rapidfuzz:
+        return int(round(fuzz.WRatio(processed_ign, processed_choice)))
+    return fuzz.WRatio(processed_ign, processed_choice, full_process=False)
+
+
+def _trigrams(processed_ign: str):
+    padded = f' {processed_ign} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class IgnMatcher:
+    """Fuzzy matches OCR'd IGNs against the roster of a tracking run.
+
+    Built once per run. Custom IGN mappings are looked up by their processed key, and roster IGNs are found through
+    a trigram index, so most IGNs are scored against a handful of candidates instead of the whole roster.
+    """
+
+    def __init__(self, igns: list[str], custom_ign_map: dict[str, str]):
+        self.igns = list(igns)
+        self.__processed_igns = [process_ign(ign) for ign in self.igns]
+        self.__custom_ign_map = {process_ign(key): value for key, value in custom_ign_map.items()}
+        self.__index: dict[str, list[int]] = {}
+        for i, processed_ign in enumerate(self.__processed_igns):
+            for trigram in _trigrams(processed_ign):
+                self.__index.setdefault(trigram, []).append(i)
+
+    def custom_ign_fix(self, ign: str):
+        """Returns the custom IGN mapping of an OCR'd IGN, or the IGN itself if it has none."""
+        return self.__custom_ign_map.get(process_ign(ign), ign)
+
+    def match(self, ign: str) -> (str, int):
+        """Returns the roster IGN most similar to the given IGN, and its percentage match."""
+        processed_ign = process_ign(ign)
+        if not processed_ign or not self.igns:
+            return None, 0
+
+        candidate_counts = Counter(i for trigram in _trigrams(processed_ign) for i in self.__index.get(trigram, []))
+        best_i, best_score = None, 0
+        for i, count in candidate_counts.most_common(MAX_CANDIDATES):
+            candidate_score = score(processed_ign, self.__processed_igns[i])
+            if candidate_score > best_score:
+                best_i, best_score = i, candidate_score
+        if best_score >= CANDIDATE_ACCEPT_SCORE:
+            return self.igns[best_i], best_score
+
+        # No close candidate, e.g. a badly misread IGN, so score the whole roster like process.extractOne
+        choices = dict(enumerate(self.__processed_igns))
+        if rapidfuzz:
+            extracted = process.extractOne(processed_ign, choices, scorer=fuzz.WRatio, processor=None)
+        else:
+            extracted = process.extractOne(processed_ign, choices, scorer=fuzz.WRatio, processor=lambda x: x)
+        if extracted is None:
+            return None, 0
+        processed_choice, choice_score, i = extracted
+        return self.igns[i], int(round(choice_score))
+
+    def candidates(self, ign: str) -> dict[int, int]:
+        """Returns the roster index and percentage match of every roster IGN that matches the given IGN."""
+        processed_ign = process_ign(ign)
+        if not processed_ign:
+            return {}
+
+        if rapidfuzz:
+            extracted = process.extract(processed_ign, self.__processed_igns, scorer=fuzz.WRatio, processor=None,
+                                        score_cutoff=MATCH_THRESHOLD, limit=None)
+            return {i: int(round(choice_score)) for processed_choice, choice_score, i in extracted
+                    if int(round(choice_score)) >= MATCH_THRESHOLD}
+
+        # Without rapidfuzz, only IGNs that share some of the IGN's characters are scored
+        candidates = {}
+        for i in {i for trigram in _trigrams(processed_ign) for i in self.__index.get(trigram, [])}:
+            candidate_score = score(processed_ign, self.__processed_igns[i])
+            if candidate_score >= MATCH_THRESHOLD:
+                candidates[i] = candidate_score
+        return candidates
+
+
+def assign(rows_candidates: list[dict[int, int]]) -> list[int]:
+    """Assigns each row at most one roster index and each roster index at most one row, maximising the total score.
+
+    Takes the candidates of each row from IgnMatcher.candidates. Returns the roster index assigned to each row, or None.
+    Rows and roster indices that share no candidates are independent, so each connected group is solved on its own.
+    """
+    # Union-find over the rows, joined through the roster indices they share
+    parents = list(range(len(rows_candidates)))
+
+    def find(row):
+        while parents[row] != row:
+            parents[row] = parents[parents[row]]
+            row = parents[row]
+        return row
+
+    first_row_of_index = {}
+    for row, candidates in enumerate(rows_candidates):
+        for i in candidates:
+            if i in first_row_of_index:
+                parents[find(row)] = find(first_row_of_index[i])
+            else:
+                first_row_of_index[i] = row
+
+    groups: dict[int, list[int]] = {}
+    for row, candidates in enumerate(rows_candidates):
+        if candidates:
+            groups.setdefault(find(row), []).append(row)
+
+    assignment = [None] * len(rows_candidates)
+    for rows in groups.values():
+        indices = sorted({i for row in rows for i in rows_candidates[row]})
+        if len(rows) == 1 or len(indices) == 1:
+            # Nothing to trade off, the best score wins
+            row, i = max(((row, i) for row in rows for i in rows_candidates[row]),
+                         key=lambda row_i: rows_candidates[row_i[0]][row_i[1]])
+            assignment[row] = i
+            continue
+
+        scores = [[rows_candidates[row].get(i, 0) for i in indices] for row in rows]
+        for row_position, index_position in _maximum_assignment(scores):
+            if scores[row_position][index_position] > 0:
+                assignment[rows[row_position]] = indices[index_position]
+    return assignment
+
+
+def _maximum_assignment(scores: list[list[int]]) -> list[tuple[int, int]]:
+    """Returns the (row, column) pairs of the assignment with the highest total score."""
+    if linear_sum_assignment is not None:
+        row_positions, column_positions = linear_sum_assignment(scores, maximize=True)
+        return list(zip(row_positions, column_positions))
+
+    if len(scores) > len(scores[0]):
+        # The Hungarian algorithm below needs at least as many columns as rows
+        transposed = [list(column) for column in zip(*scores)]
+        return [(row, column) for column, row in _hungarian([[-value for value in row] for row in transposed])]
+    return _hungarian([[-value for value in row] for row in scores])
+
+
+def _hungarian(costs: list[list[int]]) -> list[tuple[int, int]]:
+    """Hungarian algorithm with potentials. Returns the (row, column) pairs of the assignment with the lowest total
+    cost, for at most as many rows as columns."""
+    row_count, column_count = len(costs), len(costs[0])
+    infinity = float('inf')
+    # Potentials of the rows and columns, and the row assigned to each column, all offset by 1
+    u = [0] * (row_count + 1)
+    v = [0] * (column_count + 1)
+    column_rows = [0] * (column_count + 1)
+    previous_columns = [0] * (column_count + 1)
+    for row in range(1, row_count + 1):
+        column_rows[0] = row
+        column = 0
+        min_reduced_costs = [infinity] * (column_count + 1)
+        used = [False] * (column_count + 1)
+        while True:
+            used[column] = True
+            current_row = column_rows[column]
+            delta = infinity
+            next_column = 0
+            for j in range(1, column_count + 1):
+                if not used[j]:
+                    reduced_cost = costs[current_row - 1][j - 1] - u[current_row] - v[j]
+                    if reduced_cost < min_reduced_costs[j]:
+                        min_reduced_costs[j] = reduced_cost
+                        previous_columns[j] = column
+                    if min_reduced_costs[j] < delta:
+                        delta = min_reduced_costs[j]
+                        next_column = j
+            for j in range(column_count + 1):
+                if used[j]:
+                    u[column_rows[j]] += delta
+                    v[j] -= delta
+                else:
+                    min_reduced_costs[j] -= delta
+            column = next_column
+            if column_rows[column] == 0:
+                break
+        # Flip the augmenting path
+        while column != 0:
+            previous_column = previous_columns[column]
+            column_rows[column] = column_rows[previous_column]
+            column = previous_column
+
+    return [(column_rows[j] - 1, j - 1) for j in range(1, column_count + 1) if column_rows[j] != 0]
@@ -0,0 +1,56 @@
+import hashlib
+import json
+import sqlite3
+import time
+
+OCR_CACHE_PATH = 'ocr_cache.db'
+# Least recently used entries beyond this are evicted
+MAX_ENTRIES = 2000
+
+_connection: sqlite3.Connection = None
+
+
+class CachedOcr:
+    def __init__(self, text: str, rows: list[list[str]]):
+        self.text = text
+        self.rows = rows
+
+
+def _get_connection():
+    global _connection
+    if _connection is None:
+        _connection = sqlite3.connect(OCR_CACHE_PATH)
+        _connection.execute('CREATE TABLE IF NOT EXISTS ocr ('
+                            'key TEXT PRIMARY KEY, '
+                            'text TEXT NOT NULL, '
+                            'rows TEXT NOT NULL, '
+                            'last_used REAL NOT NULL)')
+        _connection.execute('CREATE INDEX IF NOT EXISTS ocr_last_used ON ocr (last_used)')
+        _connection.commit()
+    return _connection
+
+
+def key(byte_image: bytes, settings: str):
+    """Cache key of a screenshot, from its bytes and the preprocessing and OCR settings it is read with."""
+    return hashlib.sha256(settings.encode() + b'\0' + byte_image).hexdigest()
+
+
+def get(cache_key: str) -> CachedOcr:
+    connection = _get_connection()
+    row = connection.execute('SELECT text, rows FROM ocr WHERE key = ?', [cache_key]).fetchone()
+    if row is None:
+        return None
+
+    with connection:
+        connection.execute('UPDATE ocr SET last_used = ? WHERE key = ?', [time.time(), cache_key])
+    text, rows = row
+    return CachedOcr(text, json.loads(rows))
+
+
+def put(cache_key: str, cached_ocr: CachedOcr):
+    connection = _get_connection()
+    with connection:
+        connection.execute('INSERT OR REPLACE INTO ocr VALUES (?, ?, ?, ?)',
+                           [cache_key, cached_ocr.text, json.dumps(cached_ocr.rows), time.time()])
+        connection.execute('DELETE FROM ocr WHERE key NOT IN (SELECT key FROM ocr ORDER BY last_used DESC LIMIT ?)',
+                           [MAX_ENTRIES])
@@ -41,7 +41,7 @@ async def moss(interaction: discord.Interaction, member: discord.Member):
 async def __set_grove_role(interaction: discord.Interaction, member: discord.Member, grove_role_id: int,
                            grove_role_name: str):
     # Update spreadsheet
-    update_member_rank_result = sheets.update_member_rank(member.id, grove_role_name)
+    update_member_rank_result = await sheets.update_member_rank(member.id, grove_role_name)
     if update_member_rank_result == UpdateMemberRankResult.Success:
 
         await member.remove_roles(interaction.guild.get_role(config.GROVE_ROLE_ID_SPIRIT),
@@ -101,7 +101,7 @@ async def onboard_friend(guild: discord.Guild, member: discord.Member):
 
 
 async def track_past_member(member_activity_channel: discord.TextChannel, member: discord.Member, reason: str):
-    removed_member = sheets.remove_member_by_id(member.id, reason)
+    removed_member = await sheets.remove_member_by_id(member.id, reason)
     if removed_member is not None:
         # Send to log channel
         removed_member_message = f'## {removed_member.discord_mention} removed'
@@ -140,7 +140,7 @@ async def get_submains(members):
 
 
 async def audit_members(interaction: discord.Interaction):
-    tracked_members = sheets.get_members()
+    tracked_members = await sheets.get_members()
     potential_submains = await get_submains(tracked_members)
 
     tracked_member_mentions = list(
@@ -225,7 +225,7 @@ async def kick_member_by_ign(interaction: discord.Interaction, ign: str, reason:
         reason = 'Kicked for no Discord'
 
     try:
-        member = next(member for member in sheets.get_members() if
+        member = next(member for member in await sheets.get_members() if
                       member.grove_igns == ign)
     except StopIteration:
         await interaction.followup.send(f'Unable to find member with IGN {ign}.', ephemeral=True)
@@ -236,7 +236,7 @@ async def kick_member_by_ign(interaction: discord.Interaction, ign: str, reason:
             f'Error - Please use the /mod-kick command for members who have joined Discord.', ephemeral=True)
         return
 
-    removed_member_participation = sheets.remove_member_by_ign(ign, reason, user_mention)
+    removed_member_participation = await sheets.remove_member_by_ign(ign, reason, user_mention)
     if removed_member_participation is None:
         await interaction.followup.send(f'Unable to find member with IGN {ign}.', ephemeral=True)
     else:
@@ -1,11 +1,13 @@
+import asyncio
 import datetime
 from enum import Enum
 
 from googleapiclient.errors import HttpError
 
 import config
+from member import sheets_shrub
 from member.sheets_shrub import RANGE_SHRUB_PARTICIPATION, ShrubParticipation
-from utils import sheets
+from utils import sheets, store
 
 SHEET_MEMBER_TRACKING = config.MEMBER_TRACKING_SPREADSHEET_ID  # The ID of the member tracking sheet
 RANGE_MEMBERS = 'Member List!A3:G'
@@ -14,6 +16,7 @@ RANGE_MEMBERS_COL_RANK = 'G'
 RANGE_MEMBER_PARTICIPATION = 'Weekly Participation!A2:ZZZ'
 RANGE_WEEK_HEADER = 'Weekly Participation!N1'
 RANGE_WEEK = 'Weekly Participation!N2:N'
+WEEKLY_PARTICIPATION_COLUMN_INDEX = 13
 RANGE_PAST_MEMBERS = 'Past Members'
 RANGE_CUSTOM_IGN_MAPPING = 'Custom IGN Mapping!A2:B'
 RANGE_TRACKING_DATA = 'Tracking Data'
@@ -67,10 +70,15 @@ class Member:
         return self.__str__()
 
 
-def is_valid(week, datestr):
+TABLE_MEMBERS = store.Table('member_list')
+# Held while Weekly and Shrub Participation rows are read and then written by position, so no row is deleted in between
+participation_lock = asyncio.Lock()
+
+
+async def is_valid(week, datestr):
     service = sheets.get_service()
-    result = service.spreadsheets().values().get(spreadsheetId=SHEET_MEMBER_TRACKING,
-                                                 range=RANGE_WEEK_HEADER).execute()
+    result = await sheets.execute(service.spreadsheets().values().get(spreadsheetId=SHEET_MEMBER_TRACKING,
+                                                                      range=RANGE_WEEK_HEADER))
     values = result.get('values', [])
 
     if not values:
@@ -81,11 +89,8 @@ def is_valid(week, datestr):
     return f'Week {week}' in header and datestr in header
 
 
-def get_members():
-    service = sheets.get_service()
-    result = service.spreadsheets().values().get(spreadsheetId=SHEET_MEMBER_TRACKING,
-                                                 range=RANGE_MEMBERS).execute()
-    values = result.get('values', [])
+async def get_members():
+    values = await sheets.get_mirrored(SHEET_MEMBER_TRACKING, RANGE_MEMBERS, TABLE_MEMBERS)
 
     if not values:
         print('No data found.')
@@ -94,18 +99,18 @@ def get_members():
     return list(map(lambda value: Member.from_sheets_value(value), values))
 
 
-def get_new_members():
-    members = get_members()
+async def get_new_members():
+    members = await get_members()
     new_members = filter(lambda
                              member: member.discord_mention != '' and member.introed == Member.INTROED_FALSE and member.rank == ROLE_NAME_SAPLING,
                          members)
     return list(map(lambda member: member.discord_mention, new_members))
 
 
-def update_introed_new_members():
+async def update_introed_new_members():
     service = sheets.get_service()
-    result = service.spreadsheets().values().get(spreadsheetId=SHEET_MEMBER_TRACKING,
-                                                 range=RANGE_MEMBERS).execute()
+    result = await sheets.execute(service.spreadsheets().values().get(spreadsheetId=SHEET_MEMBER_TRACKING,
+                                                                      range=RANGE_MEMBERS))
     values = result.get('values', [])
     if not values:
         print('No data found.')
@@ -119,7 +124,8 @@ def update_introed_new_members():
             member.introed = Member.INTROED_TRUE
             data.append({'range': f'{RANGE_MEMBERS_COL_INTROED}{x + 3}', 'values': [[True]]})
     body = {'valueInputOption': 'USER_ENTERED', 'data': data}
-    sheets.get_service().spreadsheets().values().batchUpdate(spreadsheetId=SHEET_MEMBER_TRACKING, body=body).execute()
+    await sheets.execute(
+        sheets.get_service().spreadsheets().values().batchUpdate(spreadsheetId=SHEET_MEMBER_TRACKING, body=body))
 
 
 class UpdateMemberRankResult(Enum):
@@ -128,10 +134,10 @@ class UpdateMemberRankResult(Enum):
     NotVerified = 2
 
 
-def update_member_rank(member_id: int, grove_role_name: str):
+async def update_member_rank(member_id: int, grove_role_name: str):
     service = sheets.get_service()
-    result = service.spreadsheets().values().get(spreadsheetId=SHEET_MEMBER_TRACKING,
-                                                 range=RANGE_MEMBERS).execute()
+    result = await sheets.execute(service.spreadsheets().values().get(spreadsheetId=SHEET_MEMBER_TRACKING,
+                                                                      range=RANGE_MEMBERS))
     values = result.get('values', [])
 
     if not values:
@@ -146,71 +152,78 @@ def update_member_rank(member_id: int, grove_role_name: str):
                 return UpdateMemberRankResult.NotVerified
             member.rank = grove_role_name
             body = {'values': [[grove_role_name]]}
-            sheets.get_service().spreadsheets().values().update(spreadsheetId=SHEET_MEMBER_TRACKING,
-                                                                range=f'{RANGE_MEMBERS_COL_RANK}{x + 3}',
-                                                                valueInputOption="USER_ENTERED",
-                                                                body=body).execute()
+            await sheets.execute(
+                sheets.get_service().spreadsheets().values().update(spreadsheetId=SHEET_MEMBER_TRACKING,
+                                                                    range=f'{RANGE_MEMBERS_COL_RANK}{x + 3}',
+                                                                    valueInputOption="USER_ENTERED",
+                                                                    body=body))
             return UpdateMemberRankResult.Success
 
     return UpdateMemberRankResult.NotFound
 
 
-def remove_member_by_id(member_id: int, reason: str = ''):
-    service = sheets.get_service()
+async def remove_member_by_id(member_id: int, reason: str = ''):
+    async with participation_lock:
+        service = sheets.get_service()
+        mp_values, sp_values, member_values = await get_member_rows()
 
-    def match_weekly_participation(mp_value):
-        return len(mp_value) > MemberParticipation.INDEX_DISCORD_MENTION and mp_value[
-            MemberParticipation.INDEX_DISCORD_MENTION] == f'<@{member_id}>'
+        def match_weekly_participation(mp_value):
+            return len(mp_value) > MemberParticipation.INDEX_DISCORD_MENTION and mp_value[
+                MemberParticipation.INDEX_DISCORD_MENTION] == f'<@{member_id}>'
 
-    removed_member = delete_weekly_participation_row(service, match_weekly_participation, reason)
+        removed_member = await delete_weekly_participation_row(service, mp_values, match_weekly_participation, reason)
 
-    def match_shrub_participation(sp_value):
-        return len(sp_value) > ShrubParticipation.INDEX_DISCORD_MENTION and sp_value[
-            ShrubParticipation.INDEX_DISCORD_MENTION] == f'<@{member_id}>'
+        def match_shrub_participation(sp_value):
+            return len(sp_value) > ShrubParticipation.INDEX_DISCORD_MENTION and sp_value[
+                ShrubParticipation.INDEX_DISCORD_MENTION] == f'<@{member_id}>'
 
-    delete_shrub_participation_row(service, match_shrub_participation)
+        await delete_shrub_participation_row(service, sp_values, match_shrub_participation)
 
-    def match_member_list(member: Member):
-        return member.discord_mention == f'<@{member_id}>'
+        def match_member_list(member: Member):
+            return member.discord_mention == f'<@{member_id}>'
 
-    delete_member_list_row(service, match_member_list)
+        await delete_member_list_row(service, member_values, match_member_list)
 
-    return removed_member
+        return removed_member
 
 
-def remove_member_by_ign(ign: str, reason: str, user_mention: str):
-    service = sheets.get_service()
+async def remove_member_by_ign(ign: str, reason: str, user_mention: str):
+    async with participation_lock:
+        service = sheets.get_service()
+        mp_values, sp_values, member_values = await get_member_rows()
 
-    def match_weekly_participation(mp_value):
-        if (len(mp_value) > MemberParticipation.INDEX_GROVE_IGNS
-                and mp_value[MemberParticipation.INDEX_GROVE_IGNS] == ign):
-            # Add the Discord User mention
-            mp_value[MemberParticipation.INDEX_DISCORD_MENTION] = user_mention
-            return True
-        return False
+        def match_weekly_participation(mp_value):
+            if (len(mp_value) > MemberParticipation.INDEX_GROVE_IGNS
+                    and mp_value[MemberParticipation.INDEX_GROVE_IGNS] == ign):
+                # Add the Discord User mention
+                mp_value[MemberParticipation.INDEX_DISCORD_MENTION] = user_mention
+                return True
+            return False
 
-    removed_member = delete_weekly_participation_row(service, match_weekly_participation, reason)
+        removed_member = await delete_weekly_participation_row(service, mp_values, match_weekly_participation, reason)
 
-    def match_shrub_participation(sp_value):
-        return len(sp_value) > ShrubParticipation.INDEX_GROVE_IGNS and sp_value[
-            ShrubParticipation.INDEX_GROVE_IGNS] == ign
+        def match_shrub_participation(sp_value):
+            return len(sp_value) > ShrubParticipation.INDEX_GROVE_IGNS and sp_value[
+                ShrubParticipation.INDEX_GROVE_IGNS] == ign
 
-    delete_shrub_participation_row(service, match_shrub_participation)
+        await delete_shrub_participation_row(service, sp_values, match_shrub_participation)
 
-    def match_member_list(member: Member):
-        return member.grove_igns == ign
+        def match_member_list(member: Member):
+            return member.grove_igns == ign
 
-    delete_member_list_row(service, match_member_list)
+        await delete_member_list_row(service, member_values, match_member_list)
 
-    return removed_member
+        return removed_member
 
 
-def delete_weekly_participation_row(service, match, reason: str):
-    # Delete Weekly Participation row
-    member_participation = service.spreadsheets().values().get(spreadsheetId=SHEET_MEMBER_TRACKING,
-                                                               range=RANGE_MEMBER_PARTICIPATION).execute()
-    mp_values = member_participation.get('values', [])
+async def get_member_rows():
+    """Reads the Weekly Participation, Shrub Participation and Member List rows in one request."""
+    return await sheets.batch_get(SHEET_MEMBER_TRACKING,
+                                  [RANGE_MEMBER_PARTICIPATION, RANGE_SHRUB_PARTICIPATION, RANGE_MEMBERS])
+
 
+async def delete_weekly_participation_row(service, mp_values: list[list[str]], match, reason: str):
+    # Delete Weekly Participation row
     if not mp_values:
         print('No data found.')
         return
@@ -231,30 +244,26 @@ def delete_weekly_participation_row(service, match, reason: str):
     # Append value to Past Members sheet
     past_member_value = [datetime.date.today().strftime('%Y-%m-%d'), reason] + remove_mp_value[1:]
     body = {'values': [past_member_value]}
-    service.spreadsheets().values().append(spreadsheetId=config.MEMBER_TRACKING_SPREADSHEET_ID,
-                                           range=RANGE_PAST_MEMBERS,
-                                           valueInputOption="USER_ENTERED",
-                                           body=body).execute()
+    await sheets.execute(service.spreadsheets().values().append(spreadsheetId=config.MEMBER_TRACKING_SPREADSHEET_ID,
+                                                                range=RANGE_PAST_MEMBERS,
+                                                                valueInputOption="USER_ENTERED",
+                                                                body=body))
 
     mp_delete_body = {"requests": [{"deleteDimension": {
         "range": {"sheetId": config.MEMBER_TRACKING_SHEET_ID_WEEKLY_PARTICIPATION, "dimension": "ROWS",
                   "startIndex": delete_mp_index,
                   "endIndex": delete_mp_index + 1}}}]}
     try:
-        service.spreadsheets().batchUpdate(spreadsheetId=config.MEMBER_TRACKING_SPREADSHEET_ID,
-                                           body=mp_delete_body).execute()
+        await sheets.execute(service.spreadsheets().batchUpdate(spreadsheetId=config.MEMBER_TRACKING_SPREADSHEET_ID,
+                                                                body=mp_delete_body))
         return MemberParticipation.from_sheets_value(remove_mp_value)
     except HttpError as error:
         print(f"An error occurred: {error}")
         raise error
 
 
-def delete_shrub_participation_row(service, match):
+async def delete_shrub_participation_row(service, sp_values: list[list[str]], match):
     # Delete Shrub Participation row
-    shrub_participation = service.spreadsheets().values().get(spreadsheetId=SHEET_MEMBER_TRACKING,
-                                                              range=RANGE_SHRUB_PARTICIPATION).execute()
-    sp_values = shrub_participation.get('values', [])
-
     if not sp_values:
         print('No data found.')
         return
@@ -277,19 +286,15 @@ def delete_shrub_participation_row(service, match):
                   "startIndex": delete_sp_index,
                   "endIndex": delete_sp_index + 1}}}]}
     try:
-        service.spreadsheets().batchUpdate(spreadsheetId=config.MEMBER_TRACKING_SPREADSHEET_ID,
-                                           body=sp_delete_body).execute()
+        await sheets.execute(service.spreadsheets().batchUpdate(spreadsheetId=config.MEMBER_TRACKING_SPREADSHEET_ID,
+                                                                body=sp_delete_body))
     except HttpError as error:
         print(f"An error occurred: {error}")
         raise error
 
 
-def delete_member_list_row(service, match):
+async def delete_member_list_row(service, member_values: list[list[str]], match):
     # Delete Member List row
-    member_list = service.spreadsheets().values().get(spreadsheetId=SHEET_MEMBER_TRACKING,
-                                                      range=RANGE_MEMBERS).execute()
-    member_values = member_list.get('values', [])
-
     if not member_values:
         print('No data found.')
         return
@@ -312,8 +317,8 @@ def delete_member_list_row(service, match):
                   # Offset by 1 due to header row
                   "endIndex": member_list_delete_index + 1}}}]}
     try:
-        service.spreadsheets().batchUpdate(spreadsheetId=config.MEMBER_TRACKING_SPREADSHEET_ID,
-                                           body=member_delete_body).execute()
+        await sheets.execute(service.spreadsheets().batchUpdate(spreadsheetId=config.MEMBER_TRACKING_SPREADSHEET_ID,
+                                                                body=member_delete_body))
 
     except HttpError as error:
         print(f"An error occurred: {error}")
@@ -391,8 +396,11 @@ class MemberParticipation:
                                    mp_value[MemberParticipation.INDEX_TEN_WEEK_AVERAGE])
 
 
-def get_sorted_member_participation():
-    mp_list = get_unsorted_member_participation()
+TABLE_MEMBER_PARTICIPATION = store.Table('participation')
+
+
+async def get_sorted_member_participation():
+    mp_list = await get_unsorted_member_participation()
     filtered = list(filter(lambda mp: mp.index != -1, mp_list))  # Remove invalid entries
     ordered_list = sorted(filtered, key=lambda mp: mp.index)  # First sort by index, i.e. in-game order
     sorted_list = sorted(ordered_list, key=lambda mp: mp.score, reverse=True)  # Then sort by score, descending
@@ -400,11 +408,8 @@ def get_sorted_member_participation():
     return sorted_list
 
 
-def get_unsorted_member_participation():
-    service = sheets.get_service()
-    result = service.spreadsheets().values().get(spreadsheetId=SHEET_MEMBER_TRACKING,
-                                                 range=RANGE_MEMBER_PARTICIPATION).execute()
-    values = result.get('values', [])
+async def get_unsorted_member_participation():
+    values = await sheets.get_mirrored(SHEET_MEMBER_TRACKING, RANGE_MEMBER_PARTICIPATION, TABLE_MEMBER_PARTICIPATION)
 
     if not values:
         print('No data found.')
@@ -413,32 +418,66 @@ def get_unsorted_member_participation():
     return list(map(lambda mp_value: MemberParticipation.from_sheets_value(mp_value), values))
 
 
-def insert_weekly_participation_column(header: str):
-    insert_column_body = {"requests": [{"insertDimension": {
-        "range": {"sheetId": config.MEMBER_TRACKING_SHEET_ID_WEEKLY_PARTICIPATION,
-                  "dimension": "COLUMNS",
-                  "startIndex": 13,
-                  "endIndex": 14},
-        "inheritFromBefore": False
-    }}]}
+def weekly_participation_requests(header: str, insert_column: bool, scores: list[int]):
+    """spreadsheets.batchUpdate requests that write the week's scores, after inserting the week's column if the sheet
+    does not have it yet. Rows without a score are left as they are."""
+    requests = []
+    if insert_column:
+        requests.append({"insertDimension": {
+            "range": {"sheetId": config.MEMBER_TRACKING_SHEET_ID_WEEKLY_PARTICIPATION,
+                      "dimension": "COLUMNS",
+                      "startIndex": WEEKLY_PARTICIPATION_COLUMN_INDEX,
+                      "endIndex": WEEKLY_PARTICIPATION_COLUMN_INDEX + 1},
+            "inheritFromBefore": False
+        }})
+        requests.append(sheets.update_cells_request(config.MEMBER_TRACKING_SHEET_ID_WEEKLY_PARTICIPATION, 0,
+                                                    WEEKLY_PARTICIPATION_COLUMN_INDEX, [[header]]))
+
+    # One request for each run of consecutive scores
+    x = 0
+    while x < len(scores):
+        if scores[x] is None:
+            x += 1
+            continue
+        run_start = x
+        while x < len(scores) and scores[x] is not None:
+            x += 1
+        # Offset by 1 due to header row
+        requests.append(sheets.update_cells_request(config.MEMBER_TRACKING_SHEET_ID_WEEKLY_PARTICIPATION,
+                                                    run_start + 1, WEEKLY_PARTICIPATION_COLUMN_INDEX,
+                                                    list(map(lambda score: [score], scores[run_start:x]))))
+    return requests
+
+
+class TrackingData:
+    """Everything a tracking run reads from the member tracking sheet."""
+
+    def __init__(self, mp_list: list[MemberParticipation], sp_list: list[ShrubParticipation], week_header: str,
+                 shrub_week_header: str, scores: list[int], custom_ign_map: dict[str, str]):
+        self.mp_list = mp_list
+        self.sp_list = sp_list
+        self.week_header = week_header
+        self.shrub_week_header = shrub_week_header
+        self.scores = scores
+        self.custom_ign_map = custom_ign_map
 
-    try:
-        sheets.get_service().spreadsheets().batchUpdate(spreadsheetId=SHEET_MEMBER_TRACKING,
-                                                        body=insert_column_body).execute()
+    @staticmethod
+    def __is_week(header: str, week, datestr):
+        return f'Week {week}' in header and datestr in header
 
-        body = {'values': [[header]]}
-        sheets.get_service().spreadsheets().values().update(spreadsheetId=SHEET_MEMBER_TRACKING,
-                                                            range=RANGE_WEEK_HEADER,
-                                                            valueInputOption="USER_ENTERED",
-                                                            body=body).execute()
+    def is_valid(self, week, datestr):
+        """Whether the Weekly Participation sheet already has the week's column."""
+        return TrackingData.__is_week(self.week_header, week, datestr)
 
-    except HttpError as error:
-        print(f"An error occurred: {error}")
-        raise error
+    def is_shrub_valid(self, week, datestr):
+        """Whether the Shrub Participation sheet already has the week's columns."""
+        return TrackingData.__is_week(self.shrub_week_header, week, datestr)
 
 
-def get_weekly_participation():
-    def scores_from_sheets_value(sheets_value: list[int]):
+async def get_tracking_data():
+    """Reads the participation of both guilds, the week headers and scores and the custom IGN mapping in one
+    request."""
+    def scores_from_sheets_value(sheets_value: list[str]):
         try:
             if len(sheets_value) == 0:
                 return None
@@ -447,46 +486,23 @@ def get_weekly_participation():
         except ValueError:
             return None
 
-    service = sheets.get_service()
-    result = service.spreadsheets().values().get(spreadsheetId=SHEET_MEMBER_TRACKING,
-                                                 range=RANGE_WEEK).execute()
-    values = result.get('values', [])
+    def header_from_sheets_value(values: list[list[str]]):
+        return values[0][0] if values and values[0] else ''
 
-    if not values:
-        print('No data found.')
-        return
-
-    return list(map(scores_from_sheets_value, values))
-
-
-def update_weekly_participation(scores: list[int]):
-    try:
-        values = list(map(lambda score: [score], scores))
-        body = {'values': values}
-        sheets.get_service().spreadsheets().values().update(spreadsheetId=SHEET_MEMBER_TRACKING,
-                                                            range=RANGE_WEEK,
-                                                            valueInputOption="USER_ENTERED",
-                                                            body=body).execute()
-
-    except HttpError as error:
-        print(f"An error occurred: {error}")
-        raise error
-
-
-def get_custom_ign_mapping():
-    service = sheets.get_service()
-    result = service.spreadsheets().values().get(spreadsheetId=SHEET_MEMBER_TRACKING,
-                                                 range=RANGE_CUSTOM_IGN_MAPPING).execute()
-    values = result.get('values', [])
+    mp_values, sp_values, week_header, shrub_week_header, week, custom_ign_mapping = await sheets.batch_get(
+        SHEET_MEMBER_TRACKING, [RANGE_MEMBER_PARTICIPATION, RANGE_SHRUB_PARTICIPATION, RANGE_WEEK_HEADER,
+                                sheets_shrub.RANGE_WEEK_HEADER, RANGE_WEEK, RANGE_CUSTOM_IGN_MAPPING])
+    TABLE_MEMBER_PARTICIPATION.replace(mp_values)
 
-    if not values:
-        print('No data found.')
-        return
+    custom_ign_map = {}
+    for value in custom_ign_mapping:
+        if len(value) > 1:
+            custom_ign_map[value[1]] = value[0]
 
-    custom_ign_mapping = {}
-    for value in values:
-        custom_ign_mapping[value[1]] = value[0]
-    return custom_ign_mapping
+    return TrackingData(list(map(lambda mp_value: MemberParticipation.from_sheets_value(mp_value), mp_values)),
+                        list(map(lambda sp_value: ShrubParticipation.from_sheets_value(sp_value), sp_values)),
+                        header_from_sheets_value(week_header), header_from_sheets_value(shrub_week_header),
+                        list(map(scores_from_sheets_value, week)), custom_ign_map)
 
 
 class Track:
@@ -525,18 +541,46 @@ class Track:
                 self.raw_ign, self.matched_percent]
 
 
-def append_tracks(tracks: list[Track]):
-    def track_to_sheets_values(sheets_track: Track):
-        return sheets_track.to_sheets_value()
-
-    body = {'values': list(map(track_to_sheets_values, tracks))}
-    sheets.get_service().spreadsheets().values().append(spreadsheetId=SHEET_MEMBER_TRACKING,
-                                                        range=RANGE_TRACKING_DATA, valueInputOption="USER_ENTERED",
-                                                        body=body).execute()
-
+async def save_tracking(header: str, insert_grove_column: bool, scores: list[int], insert_shrub_columns: bool,
+                        wp_list: list[sheets_shrub.WeeklyParticipation], tracks: list[Track],
+                        errors: list[list[str]]):
+    """Saves a tracking run in one spreadsheets.batchUpdate, which Sheets applies entirely or not at all: the week's
+    Grove and Shrub participation, and the tracks and errors. Either guild's participation is left as it is when its
+    scores or wp_list is None.
+
+    The tracks and errors are appended to their sheets by sheet ID, looked up by title. If a sheet cannot be looked up,
+    its rows are appended by name after the batchUpdate instead."""
+    requests = []
+    if scores is not None:
+        requests += weekly_participation_requests(header, insert_grove_column, scores)
+    if wp_list is not None:
+        requests += sheets_shrub.weekly_participation_requests(header, insert_shrub_columns, wp_list)
+
+    appends = []
+    sheet_ids = {}
+    if tracks or errors:
+        try:
+            sheet_ids = await sheets.get_sheet_ids(SHEET_MEMBER_TRACKING)
+        except HttpError as error:
+            print(f"An error occurred: {error}")
+    tracks_values = list(map(lambda sheets_track: sheets_track.to_sheets_value(), tracks))
+    for sheet_name, values in ((RANGE_TRACKING_DATA, tracks_values), (RANGE_TRACKING_ERRORS, errors)):
+        if not values:
+            continue
+        if sheet_name in sheet_ids:
+            requests.append(sheets.append_cells_request(sheet_ids[sheet_name], values))
+        else:
+            print(f'Sheet {sheet_name} not found, appending to it by name')
+            appends.append((sheet_name, values))
 
-def append_errors(errors: list[str]):
-    body = {'values': errors}
-    sheets.get_service().spreadsheets().values().append(spreadsheetId=SHEET_MEMBER_TRACKING,
-                                                        range=RANGE_TRACKING_ERRORS, valueInputOption="USER_ENTERED",
-                                                        body=body).execute()
+    try:
+        if requests:
+            await sheets.execute(sheets.get_service().spreadsheets().batchUpdate(spreadsheetId=SHEET_MEMBER_TRACKING,
+                                                                                 body={"requests": requests}))
+        for sheet_name, values in appends:
+            await sheets.execute(sheets.get_service().spreadsheets().values().append(
+                spreadsheetId=SHEET_MEMBER_TRACKING, range=sheet_name, valueInputOption="USER_ENTERED",
+                body={'values': values}))
+    except HttpError as error:
+        print(f"An error occurred: {error}")
+        raise error
@@ -1,7 +1,5 @@
 from functools import reduce
 
-from googleapiclient.errors import HttpError
-
 import config
 from utils import sheets
 
@@ -16,20 +14,6 @@ CULVERT_POINT_SCORE = 300
 FLAG_POINT_SCORE = 50
 
 
-def is_valid(week, datestr):
-    service = sheets.get_service()
-    result = service.spreadsheets().values().get(spreadsheetId=SHEET_MEMBER_TRACKING,
-                                                 range=RANGE_WEEK_HEADER).execute()
-    values = result.get('values', [])
-
-    if not values:
-        print('No data found.')
-        return
-
-    header = values[0][0]
-    return f'Week {week}' in header and datestr in header
-
-
 class ShrubParticipation:
     LENGTH = 5
 
@@ -63,41 +47,14 @@ class ShrubParticipation:
                                   sp_value[ShrubParticipation.INDEX_DISCORD_MENTION])
 
 
-def get_unsorted_shrub_participation():
-    service = sheets.get_service()
-    result = service.spreadsheets().values().get(spreadsheetId=SHEET_MEMBER_TRACKING,
-                                                 range=RANGE_SHRUB_PARTICIPATION).execute()
-    values = result.get('values', [])
-
-    if not values:
-        print('No data found.')
-        return
-
-    return list(map(lambda sp_value: ShrubParticipation.from_sheets_value(sp_value), values))
-
-
-def insert_weekly_participation_columns(header: str):
-    insert_column_body = {"requests": [{"insertDimension": {
+def insert_weekly_participation_columns_request():
+    return {"insertDimension": {
         "range": {"sheetId": config.MEMBER_TRACKING_SHEET_ID_SHRUB_PARTICIPATION,
                   "dimension": "COLUMNS",
                   "startIndex": WEEKLY_PARTICIPATION_COLUMN_INDEX,
                   "endIndex": WEEKLY_PARTICIPATION_COLUMN_INDEX + WEEKLY_PARTICIPATION_COLUMNS},
         "inheritFromBefore": False
-    }}]}
-
-    try:
-        sheets.get_service().spreadsheets().batchUpdate(spreadsheetId=SHEET_MEMBER_TRACKING,
-                                                        body=insert_column_body).execute()
-
-        body = {'values': [[header, 'Details']]}
-        sheets.get_service().spreadsheets().values().update(spreadsheetId=SHEET_MEMBER_TRACKING,
-                                                            range=RANGE_WEEK_HEADER,
-                                                            valueInputOption="USER_ENTERED",
-                                                            body=body).execute()
-
-    except HttpError as error:
-        print(f"An error occurred: {error}")
-        raise error
+    }}
 
 
 class WeeklyParticipation:
@@ -144,14 +101,17 @@ class WeeklyParticipation:
                                   f'{reduce(lambda acc, val: acc + (chr(10) if acc else "") + val, self.mule_igns)}')]
 
 
-def update_weekly_participation(wp_list: list[WeeklyParticipation]):
-    try:
-        body = {'values': list(map(lambda wp: wp.to_sheets_value(), wp_list))}
-        sheets.get_service().spreadsheets().values().update(spreadsheetId=SHEET_MEMBER_TRACKING,
-                                                            range=RANGE_WEEK,
-                                                            valueInputOption="USER_ENTERED",
-                                                            body=body).execute()
-
-    except HttpError as error:
-        print(f"An error occurred: {error}")
-        raise error
+def weekly_participation_requests(header: str, insert_columns: bool, wp_list: list[WeeklyParticipation]):
+    """spreadsheets.batchUpdate requests that write the week's participation, after inserting the week's columns if the
+    sheet does not have them yet."""
+    requests = []
+    if insert_columns:
+        requests.append(insert_weekly_participation_columns_request())
+        requests.append(sheets.update_cells_request(config.MEMBER_TRACKING_SHEET_ID_SHRUB_PARTICIPATION, 0,
+                                                    WEEKLY_PARTICIPATION_COLUMN_INDEX, [[header, 'Details']]))
+    if wp_list:
+        # Offset by 1 due to header row
+        requests.append(sheets.update_cells_request(config.MEMBER_TRACKING_SHEET_ID_SHRUB_PARTICIPATION, 1,
+                                                    WEEKLY_PARTICIPATION_COLUMN_INDEX,
+                                                    list(map(lambda wp: wp.to_sheets_value(), wp_list))))
+    return requests
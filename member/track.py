@@ -1,139 +1,247 @@
+import asyncio
+
 import discord
 
 from member import sheets, sheets_shrub, common, extractor
 from member.sheets_shrub import WeeklyParticipation
 
+# Messages fetched and attachments downloaded at once
+MAX_CONCURRENT_DOWNLOADS = 8
+
+
+GUILD_GROVE = 'Grove'
+GUILD_SHRUB = 'Shrub'
+
 
 class Character:
-    def __init__(self, ign: str, discord_mention: str):
+    def __init__(self, ign: str, discord_mention: str, guild: str):
         self.ign = ign
         self.discord_mention = discord_mention
+        self.guild = guild
 
     def __str__(self):
-        return str([self.ign, self.discord_mention])
+        return str([self.ign, self.discord_mention, self.guild])
 
     def __repr__(self):
         return self.__str__()
 
 
-async def track_grove(interaction: discord.Interaction, message_ids: list[int]):
-    thursday_string = common.thursday().strftime('%Y-%m-%d')
+def __grove_characters(mp_list: list[sheets.MemberParticipation]):
     characters = []
-    for sheets_member in sheets.get_unsorted_member_participation():
+    for sheets_member in mp_list:
         for ign in sheets_member.grove_igns.split('\n'):
-            characters.append(Character(ign, sheets_member.discord_mention))
-    print(f'Characters: {characters}')
+            characters.append(Character(ign, sheets_member.discord_mention, GUILD_GROVE))
+    return characters
 
-    tracks, errors = await __track(interaction, message_ids, thursday_string, characters, 'Grove')
 
-    sheets.append_tracks(tracks)
+def __shrub_characters(sp_list: list[sheets_shrub.ShrubParticipation]):
+    characters = []
+    for sheets_member in sp_list:
+        for ign in sheets_member.mule_igns.split('\n'):
+            characters.append(Character(ign, sheets_member.discord_mention, GUILD_SHRUB))
+    return characters
 
-    for character in characters:
-        if character.ign != '':
-            errors.append(['Missing', thursday_string, character.discord_mention, character.ign, 'Grove'])
-    sheets.append_errors(errors)
 
-    await interaction.followup.send(f'### Tracking data saved for Grove\nSuccess: {len(tracks)}\nError: {len(errors)}')
+def __missing_errors(characters: list[Character], day_string: str):
+    return [['Missing', day_string, character.discord_mention, character.ign, character.guild]
+            for character in characters if character.guild == GUILD_GROVE and character.ign != '']
 
-    week_header = __update_weekly_participation(tracks)
+
+async def track_grove(interaction: discord.Interaction, message_ids: list[int]):
+    thursday_string = common.thursday().strftime('%Y-%m-%d')
+    data = await sheets.get_tracking_data()
+    characters = __grove_characters(data.mp_list)
+    print(f'Characters: {characters}')
+
+    tracks, errors = await __track(interaction, message_ids, thursday_string, characters, data.custom_ign_map)
+    errors += __missing_errors(characters, thursday_string)
+
+    week_header = await __save(tracks, [], errors, True, False)
+    await interaction.followup.send(f'### Tracking data saved for Grove\nSuccess: {len(tracks)}\nError: {len(errors)}')
     await interaction.followup.send(f'{week_header} Grove tracking complete!')
 
 
 async def track_shrub(interaction: discord.Interaction, message_ids: list[int]):
     thursday_string = common.thursday().strftime('%Y-%m-%d')
-    characters = []
-    for sheets_member in sheets_shrub.get_unsorted_shrub_participation():
-        for ign in sheets_member.mule_igns.split('\n'):
-            characters.append(Character(ign, sheets_member.discord_mention))
+    data = await sheets.get_tracking_data()
+    characters = __shrub_characters(data.sp_list)
     print(f'Characters: {characters}')
 
-    tracks, errors = await __track(interaction, message_ids, thursday_string, characters, "Shrub")
-    sheets.append_tracks(tracks)
-    sheets.append_errors(errors)
+    tracks, errors = await __track(interaction, message_ids, thursday_string, characters, data.custom_ign_map)
 
+    week_header = await __save([], tracks, errors, False, True)
     await interaction.followup.send(
         f'### Tracking data saved for Shrub\nSuccess: {len(tracks)}\nError: {len(errors)}')
-
-    week_header = __update_shrub_participation(tracks)
     await interaction.followup.send(f'{week_header} Shrub tracking complete!')
 
 
+async def track_all(interaction: discord.Interaction, message_ids: list[int]):
+    """Tracks Grove and Shrub screenshots together, reading every screenshot once against both rosters."""
+    thursday_string = common.thursday().strftime('%Y-%m-%d')
+    data = await sheets.get_tracking_data()
+    characters = __grove_characters(data.mp_list) + __shrub_characters(data.sp_list)
+    print(f'Characters: {characters}')
+
+    tracks, errors = await __track(interaction, message_ids, thursday_string, characters, data.custom_ign_map)
+    grove_tracks = [track for track in tracks if track.guild == GUILD_GROVE]
+    shrub_tracks = [track for track in tracks if track.guild == GUILD_SHRUB]
+    errors += __missing_errors(characters, thursday_string)
+
+    week_header = await __save(grove_tracks, shrub_tracks, errors, True, True)
+    await interaction.followup.send(f'### Tracking data saved for Grove and Shrub\n'
+                                    f'Grove: {len(grove_tracks)}\nShrub: {len(shrub_tracks)}\nError: {len(errors)}')
+    await interaction.followup.send(f'{week_header} Grove and Shrub tracking complete!')
+
+
 async def __track(interaction: discord.Interaction, message_ids: list[int], day_string: str,
-                  characters: list[Character], guild: str):
+                  characters: list[Character], custom_ign_map: dict[str, str]):
+    """Reads the screenshots attached to the messages and returns their tracks and errors, showing the progress of each
+    screenshot as soon as it is read. The rows are matched once every screenshot is read. Matched characters are
+    removed from characters."""
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_DOWNLOADS)
+
+    async def fetch_message(message_id: int):
+        async with semaphore:
+            return await interaction.channel.fetch_message(message_id)
+
+    async def read(attachment: discord.Attachment):
+        async with semaphore:
+            return await attachment.read()
+
     attachments = []
-    try:
-        for message_id in message_ids:
-            message = await interaction.channel.fetch_message(message_id)
+    for message in await asyncio.gather(*[fetch_message(message_id) for message_id in message_ids],
+                                        return_exceptions=True):
+        if isinstance(message, Exception):
+            await interaction.followup.send(f'Error - {message}')
+        else:
             attachments += message.attachments
-    except Exception as e:
-        await interaction.followup.send(f'Error - {e}')
-    byte_images = []
-    for attachment in attachments:
-        byte_images.append(await attachment.read())
-    await interaction.followup.send(f'Tracking {len(byte_images)} screenshots. This might take a few minutes.')
-    custom_ign_map = sheets.get_custom_ign_mapping()
-    results, errors = await extractor.extract(interaction, list(map(lambda character: character.ign, characters)),
-                                              custom_ign_map, byte_images)
-    tracks = []
-    for result in results:
-        try:
-            character = next(character for character in characters if result.matched_ign == character.ign)
-            track = sheets.Track(day_string, character.discord_mention, result.matched_ign, guild,
-                                 result.weekly_mission, result.culvert, result.flag, result.raw_ign(),
-                                 result.matched_percent)
-            tracks.append(track)
-            characters.remove(character)
-        except StopIteration:
-            # This should already be captured in errors during extraction
-            pass
+    # Screenshots are downloaded in the background, and each one is processed as soon as it is downloaded
+    byte_images = [asyncio.create_task(read(attachment)) for attachment in attachments]
+    progress_header = f'Tracking {len(byte_images)} screenshots. This might take a few minutes.'
+    progress = await interaction.followup.send(progress_header, wait=True)
 
-    errors = list(map(lambda error: [error[0], day_string, '', '', guild] + error[1:], errors))
+    character_index = __index_characters(characters)
+    tracks = []
+    errors = []
+    read_count = 0
+    previously_read_count = 0
+    row_count = 0
+
+    async def show_progress(status: str):
+        await progress.edit(content=f'{progress_header}\n'
+                                    f'Read {read_count}/{len(byte_images)}'
+                                    f'{f" ({previously_read_count} previously read)" if previously_read_count else ""}'
+                                    f' - {status}, {len(errors)} errors')
+
+    async for extracted in extractor.extract(list(map(lambda character: character.ign, characters)),
+                                             list(map(lambda character: character.guild, characters)),
+                                             custom_ign_map, byte_images):
+        errors += list(map(lambda error: [error[0], day_string, '', '', error[1]] + error[2:], extracted.errors))
+        if isinstance(extracted, extractor.MatchResult):
+            # Every screenshot is read and the rows are matched
+            tracks = __tracks_from_results(extracted.results, character_index, day_string)
+            await show_progress(f'{len(tracks)} tracked')
+            continue
+
+        read_count += 1
+        if extracted.previously_read:
+            previously_read_count += 1
+        row_count += len(extracted.rows)
+        await show_progress(f'{row_count} rows to match')
+
+    __remove_tracked(characters, character_index)
     return tracks, errors
 
 
-def __update_weekly_participation(tracks: list[sheets.Track]):
-    guild_week = common.guild_week()
-    thursday_string = common.thursday().strftime('%Y-%m-%d')
-    if not sheets.is_valid(guild_week, thursday_string):
-        sheets.insert_weekly_participation_column(f'Week {guild_week}\n{thursday_string}')
+def __index_characters(characters: list[Character]):
+    """Indexes characters by guild and IGN, keeping their order."""
+    character_index: dict[tuple[str, str], list[Character]] = {}
+    for character in characters:
+        character_index.setdefault((character.guild, character.ign), []).append(character)
+    return character_index
+
 
-    mp_list = sheets.get_unsorted_member_participation()
-    scores = sheets.get_weekly_participation()
+def __remove_tracked(characters: list[Character], character_index: dict[tuple[str, str], list[Character]]):
+    """Leaves only the characters that are still in the index, i.e. were not tracked, in characters."""
+    untracked = {id(character) for characters_left in character_index.values() for character in characters_left}
+    characters[:] = [character for character in characters if id(character) in untracked]
+
+
+def __tracks_from_results(results: list[extractor.Result], character_index: dict[tuple[str, str], list[Character]],
+                          day_string: str):
+    """Returns the track of each result, removing its character from the index."""
+    tracks = []
+    for result in results:
+        characters_left = character_index.get((result.guild, result.matched_ign))
+        if not characters_left:
+            # This should already be captured in errors during extraction
+            continue
+        character = characters_left.pop(0)
+        tracks.append(sheets.Track(day_string, character.discord_mention, result.matched_ign, character.guild,
+                                   result.weekly_mission, result.culvert, result.flag, result.raw_ign(),
+                                   result.matched_percent))
+    return tracks
+
+
+def __weekly_participation_scores(mp_list: list[sheets.MemberParticipation], scores: list[int],
+                                  tracks: list[sheets.Track]):
     if scores is None:
         scores = [None] * len(mp_list)
     else:
         scores = scores + [None] * (len(mp_list) - len(scores))
+
+    # Best score of each member's characters
+    best_scores: dict[str, float] = {}
+    for track in tracks:
+        new_score = track.mission / 2
+        if track.culvert > 0:
+            new_score += 10
+        if track.flag > 0:
+            new_score += 10
+        if track.discord_mention not in best_scores or new_score > best_scores[track.discord_mention]:
+            best_scores[track.discord_mention] = new_score
+
     for x in range(len(mp_list)):
-        member = mp_list[x]
-        for track in tracks:
-            if member.discord_mention == track.discord_mention:
-                new_score = track.mission / 2
-                if track.culvert > 0:
-                    new_score += 10
-                if track.flag > 0:
-                    new_score += 10
-                if scores[x] is None or new_score > scores[x]:
-                    scores[x] = new_score
-
-    sheets.update_weekly_participation(scores)
-    return f'Week {guild_week} - {thursday_string}'
+        new_score = best_scores.get(mp_list[x].discord_mention)
+        if new_score is not None and (scores[x] is None or new_score > scores[x]):
+            scores[x] = new_score
+    return scores
 
 
-def __update_shrub_participation(tracks: list[sheets.Track]):
-    guild_week = common.guild_week()
-    thursday_string = common.thursday().strftime('%Y-%m-%d')
-    if not sheets_shrub.is_valid(guild_week, thursday_string):
-        sheets_shrub.insert_weekly_participation_columns(
-            f'Week {guild_week}\n{thursday_string}')
+def __shrub_participation(sp_list: list[sheets_shrub.ShrubParticipation], tracks: list[sheets.Track]):
+    tracks_by_mention: dict[str, list[sheets.Track]] = {}
+    for track in tracks:
+        if track.mission > 0:  # Only count if the boss mule is active
+            tracks_by_mention.setdefault(track.discord_mention, []).append(track)
 
     wp_list = []
-    for member in sheets_shrub.get_unsorted_shrub_participation():
+    for member in sp_list:
         participation = WeeklyParticipation()
         wp_list.append(participation)
-        for track in tracks:
-            if (member.discord_mention == track.discord_mention
-                    and track.mission > 0):  # Only count if the boss mule is active
-                participation.add(track.ign, track.culvert, track.flag)
+        for track in tracks_by_mention.get(member.discord_mention, []):
+            participation.add(track.ign, track.culvert, track.flag)
+    return wp_list
+
 
-    sheets_shrub.update_weekly_participation(wp_list)
+async def __save(grove_tracks: list[sheets.Track], shrub_tracks: list[sheets.Track], errors: list[list[str]],
+                 grove: bool, shrub: bool):
+    """Saves the run's tracks and errors and the week's participation of the tracked guilds together.
+
+    Participation rows are written by position, so the sheet is read again just before, as members may have been
+    removed and another run may have added the week's columns while the screenshots were being read.
+    """
+    guild_week = common.guild_week()
+    thursday_string = common.thursday().strftime('%Y-%m-%d')
+    async with sheets.participation_lock:
+        data = await sheets.get_tracking_data()
+        grove_valid = data.is_valid(guild_week, thursday_string)
+        shrub_valid = data.is_shrub_valid(guild_week, thursday_string)
+
+        scores = None
+        if grove:
+            # Without the week's column, the scores read are last week's
+            scores = __weekly_participation_scores(data.mp_list, data.scores if grove_valid else None, grove_tracks)
+        wp_list = __shrub_participation(data.sp_list, shrub_tracks) if shrub else None
+        await sheets.save_tracking(f'Week {guild_week}\n{thursday_string}', not grove_valid, scores, not shrub_valid,
+                                   wp_list, grove_tracks + shrub_tracks, errors)
     return f'Week {guild_week} - {thursday_string}'
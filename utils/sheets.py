@@ -1,39 +1,605 @@
 from __future__ import print_function
 
+import asyncio
 import os.path
+import random
+import re
+import socket
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
 
+import google_auth_httplib2
+import httplib2
+from google.auth.exceptions import RefreshError
 from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
 from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 
+from utils import store
+
 # If modifying these scopes, delete the file token.json.
 SCOPES = ['https://www.googleapis.com/auth/spreadsheets']
+TOKEN_PATH = 'token.json'
+CREDENTIALS_PATH = 'credentials.json'
+
+# Refresh the access token this long before it expires, so no request ever waits on a refresh
+REFRESH_MARGIN = timedelta(minutes=5)
+HTTP_TIMEOUT_SECONDS = 60
+
+# Number of Sheets requests that may be in flight at once
+MAX_CONCURRENT_REQUESTS = 8
+# Requests that wait longer than this for a free worker are logged, as the pool is saturated
+SATURATED_WAIT_SECONDS = 0.5
+# Queued writes are sent once no new write has been queued for this long
+WRITE_DEBOUNCE_SECONDS = 2
+
+# Sheets API quota is 60 requests per minute per user. Requests are paced to stay under it, with a small burst.
+RATE_LIMIT_PER_MINUTE = 60
+RATE_LIMIT_BURST = 10
+# Responses that are retried with jittered exponential backoff. A 429 is rejected before it is applied, but a request
+# that failed with any of the others may have been applied, so only idempotent requests are retried after them.
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+MAX_RETRIES = 5
+RETRY_BASE_SECONDS = 1
+RETRY_MAX_SECONDS = 32
+# Number of minutes of request usage kept
+USAGE_MINUTES = 60
+
+# How often the reconciler retries sending queued requests, and how often it reads back edits made in Sheets
+PUSH_INTERVAL_SECONDS = 60
+PULL_INTERVAL_SECONDS = 300
+# Errors that mean Sheets could not be reached, rather than a problem with the request
+REQUEST_ERRORS = (HttpError, OSError, httplib2.HttpLib2Error)
+# Errors raised before a request reaches Sheets, so it is known not to have been applied
+NOT_SENT_ERRORS = (ConnectionRefusedError, socket.gaierror, httplib2.ServerNotFoundError, RefreshError)
+# Outbox request types that are not safe to send twice: appends add the rows again, and structural updates such as a
+# row delete by index apply to whichever row is at the index by then
+NON_IDEMPOTENT_REQUEST_TYPES = {'append', 'spreadsheet'}
+
+_lock = threading.RLock()
+_creds: Credentials = None
+_service = None
+_refresh_timer: threading.Timer = None
+_thread_local = threading.local()
+_executor = ThreadPoolExecutor(max_workers=MAX_CONCURRENT_REQUESTS, thread_name_prefix='sheets')
+# Sheet ID of each sheet title, by spreadsheet ID
+_sheet_ids: dict[str, dict[str, int]] = {}
+
+
+class RequestStats:
+    def __init__(self):
+        self.count = 0
+        self.in_flight = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.total_duration = 0.0
+        self.max_duration = 0.0
+        self._lock = threading.Lock()
+
+    def __str__(self):
+        if self.count == 0:
+            return 'No Sheets requests made.'
+        return (f'Requests: {self.count} ({self.in_flight} in flight)\n'
+                f'Wait: {self.total_wait / self.count:.3f}s average, {self.max_wait:.3f}s max\n'
+                f'Duration: {self.total_duration / self.count:.3f}s average, {self.max_duration:.3f}s max')
+
+    def __repr__(self):
+        return self.__str__()
+
+    def record(self, wait: float, duration: float):
+        # Called from the worker threads
+        with self._lock:
+            self.count += 1
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+            self.total_duration += duration
+            self.max_duration = max(self.max_duration, duration)
+
+
+class TokenBucket:
+    """Paces requests to a steady rate, allowing short bursts up to the bucket capacity."""
+
+    def __init__(self, rate_per_minute: int, capacity: int):
+        self.rate = rate_per_minute / 60
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated_at = time.monotonic()
+        self.__lock = asyncio.Lock()
+
+    async def acquire(self) -> float:
+        """Waits for a token and returns how long the caller was throttled."""
+        # Waiters queue on the lock, so tokens are handed out in request order
+        async with self.__lock:
+            throttled = 0.0
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return throttled
+                delay = (1 - self.tokens) / self.rate
+                throttled += delay
+                await asyncio.sleep(delay)
+
+
+class QuotaUsage:
+    """Per-minute counts of Sheets requests, retries and throttling."""
+
+    def __init__(self):
+        self.__minutes: OrderedDict[str, dict[str, float]] = OrderedDict()
+
+    def __str__(self):
+        lines = [f'{minute} | requests: {usage["requests"]}, retries: {usage["retries"]}, '
+                 f'throttled: {usage["throttled"]:.1f}s'
+                 for minute, usage in list(self.__minutes.items())[-5:]]
+        return '\n'.join(lines) if lines else 'No Sheets quota usage.'
+
+    def __repr__(self):
+        return self.__str__()
+
+    def __current(self):
+        minute = datetime.utcnow().strftime('%Y-%m-%d %H:%M')
+        if minute not in self.__minutes:
+            self.__minutes[minute] = {'requests': 0, 'retries': 0, 'throttled': 0.0}
+            while len(self.__minutes) > USAGE_MINUTES:
+                self.__minutes.popitem(last=False)
+        return self.__minutes[minute]
+
+    def record_request(self, throttled: float):
+        usage = self.__current()
+        usage['requests'] += 1
+        usage['throttled'] += throttled
+
+    def record_retry(self):
+        self.__current()['retries'] += 1
+
+    def requests_this_minute(self):
+        return self.__current()['requests']
+
+
+stats = RequestStats()
+usage = QuotaUsage()
+_rate_limiter = TokenBucket(RATE_LIMIT_PER_MINUTE, RATE_LIMIT_BURST)
 
 
 def get_service():
+    """Returns the process-wide Sheets client, building it on first use.
+
+    The client is shared by every thread. Requests are built on any thread, and only bound to an HTTP connection when
+    they are executed on a worker, through that worker's own connection, since httplib2 connections are not
+    thread-safe. Each is authorized with the in-memory credentials.
+    """
+    global _service
+    with _lock:
+        if _service is None:
+            try:
+                # static_discovery uses the discovery document bundled with googleapiclient, no fetch required
+                _service = build('sheets', 'v4', credentials=_get_credentials(), static_discovery=True)
+            except HttpError as err:
+                print(err)
+                return None
+        return _service
+
+
+async def execute(request):
+    """Executes a Sheets API request on the Sheets worker pool without blocking the event loop.
+
+    Requests are paced by the shared rate limiter to stay under the Sheets API quota. Rate limit (429) and server
+    error responses are retried with jittered exponential backoff, so heavy flows slow down instead of failing.
+
+    Usage: `result = await sheets.execute(service.spreadsheets().values().get(...))`
+    """
+    attempt = 0
+    while True:
+        throttled = await _rate_limiter.acquire()
+        usage.record_request(throttled)
+        try:
+            return await _execute_once(request)
+        except HttpError as error:
+            if error.resp.status not in RETRY_STATUSES or attempt >= MAX_RETRIES:
+                raise error
+            if error.resp.status != 429 and not _is_idempotent(request):
+                # May have been applied, so sending it again could apply it twice
+                raise error
+
+            delay = min(RETRY_MAX_SECONDS, RETRY_BASE_SECONDS * 2 ** attempt) + random.uniform(0, 1)
+            print(f'Sheets request failed with {error.resp.status}, retrying in {delay:.1f}s')
+            usage.record_retry()
+            attempt += 1
+            await asyncio.sleep(delay)
+
+
+def _is_idempotent(request) -> bool:
+    """Whether sending a request twice has the same effect as sending it once. Reads and value updates are, while
+    appends and spreadsheets.batchUpdate, which holds structural updates such as row inserts and deletes, are not."""
+    path = request.uri.split('?')[0]
+    return ':append' not in path and (not path.endswith(':batchUpdate') or path.endswith('/values:batchUpdate'))
+
+
+async def _execute_once(request):
+    queued_at = time.perf_counter()
+    stats.in_flight += 1
+
+    def run():
+        started_at = time.perf_counter()
+        try:
+            # Bound here rather than when the request is built, which happens on the event loop thread
+            return request.execute(http=google_auth_httplib2.AuthorizedHttp(_get_credentials(), http=_get_http()))
+        finally:
+            wait = started_at - queued_at
+            duration = time.perf_counter() - started_at
+            stats.record(wait, duration)
+            if wait > SATURATED_WAIT_SECONDS:
+                print(f'Sheets request waited {wait:.3f}s for a worker, took {duration:.3f}s')
+
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_executor, run)
+    finally:
+        stats.in_flight -= 1
+
+
+def cell_data(value) -> dict:
+    """CellData of a value for a spreadsheets.batchUpdate, entered the way valueInputOption USER_ENTERED enters the
+    values the bot writes: numbers, formulas and yyyy-mm-dd dates. None and empty strings clear the cell."""
+    if value is None or value == '':
+        return {}
+    if isinstance(value, bool):
+        return {'userEnteredValue': {'boolValue': value}}
+    if isinstance(value, (int, float)):
+        return {'userEnteredValue': {'numberValue': value}}
+
+    value = str(value)
+    if value.startswith('='):
+        return {'userEnteredValue': {'formulaValue': value}}
+    if re.fullmatch(r'\d{4}-\d{2}-\d{2}', value):
+        year, month, day = value.split('-')
+        # Entered as a date, the way USER_ENTERED parses one
+        return {'userEnteredValue': {'formulaValue': f'=DATE({int(year)},{int(month)},{int(day)})'}}
+    if re.fullmatch(r'-?\d+', value):
+        return {'userEnteredValue': {'numberValue': int(value)}}
+    if re.fullmatch(r'-?\d*\.\d+', value):
+        return {'userEnteredValue': {'numberValue': float(value)}}
+    return {'userEnteredValue': {'stringValue': value}}
+
+
+def update_cells_request(sheet_id: int, row_index: int, column_index: int, values: list[list]) -> dict:
+    """updateCells request that writes rows of values from a cell, given by zero-based indices."""
+    return {'updateCells': {'start': {'sheetId': sheet_id, 'rowIndex': row_index, 'columnIndex': column_index},
+                            'rows': [{'values': list(map(cell_data, row))} for row in values],
+                            'fields': 'userEnteredValue'}}
+
+
+def append_cells_request(sheet_id: int, values: list[list]) -> dict:
+    """appendCells request that adds rows of values after the last row with data in a sheet."""
+    return {'appendCells': {'sheetId': sheet_id,
+                            'rows': [{'values': list(map(cell_data, row))} for row in values],
+                            'fields': 'userEnteredValue'}}
+
+
+async def get_sheet_ids(spreadsheet_id: str) -> dict[str, int]:
+    """Returns the sheet ID of each sheet title in a spreadsheet. Read once, then kept for the life of the bot."""
+    sheet_ids = _sheet_ids.get(spreadsheet_id)
+    if sheet_ids is None:
+        result = await execute(get_service().spreadsheets().get(spreadsheetId=spreadsheet_id,
+                                                                fields='sheets.properties(sheetId,title)'))
+        sheet_ids = {sheet['properties']['title']: sheet['properties']['sheetId'] for sheet in result.get('sheets', [])}
+        _sheet_ids[spreadsheet_id] = sheet_ids
+    return sheet_ids
+
+
+async def batch_get(spreadsheet_id: str, ranges: list[str]) -> list[list[list[str]]]:
+    """Reads several ranges of a spreadsheet in one values.batchGet request.
+
+    Returns the values of each range, in the same order as the requested ranges.
+    """
+    result = await execute(get_service().spreadsheets().values().batchGet(spreadsheetId=spreadsheet_id,
+                                                                          ranges=ranges))
+    return [value_range.get('values', []) for value_range in result.get('valueRanges', [])]
+
+
+class Prefetch:
+    """Reads the ranges each spreadsheet needs at startup in one values.batchGet, shared by all the cogs.
+
+    The batchGet of a spreadsheet is made by the first cog to ask for any of its ranges, and the others wait on the
+    same request.
+    """
+
+    def __init__(self, ranges: dict[str, list[str]]):
+        self.__ranges = ranges
+        self.__tasks: dict[str, asyncio.Task] = {}
+
+    async def batch_get(self, spreadsheet_id: str, ranges: list[str]) -> list[list[list[str]]]:
+        """Same as sheets.batch_get, for ranges that were given to the prefetch."""
+        task = self.__tasks.get(spreadsheet_id)
+        if task is None:
+            task = asyncio.create_task(batch_get(spreadsheet_id, self.__ranges[spreadsheet_id]))
+            self.__tasks[spreadsheet_id] = task
+        values = await asyncio.shield(task)
+        return [values[self.__ranges[spreadsheet_id].index(range_name)] for range_name in ranges]
+
+
+async def get_mirrored(spreadsheet_id: str, range_name: str, table: store.Table) -> list[list[str]]:
+    """Reads a range from Sheets and keeps a copy in the local store, which is read instead if Sheets is unavailable.
+
+    For ranges that are written by row position straight to Sheets, so the Sheets copy is always the one to use.
+    """
+    try:
+        result = await execute(get_service().spreadsheets().values().get(spreadsheetId=spreadsheet_id,
+                                                                          range=range_name))
+    except REQUEST_ERRORS as error:
+        print(f'Using the local copy of {range_name}, Sheets could not be read: {error}')
+        return table.load()
+
+    values = result.get('values', [])
+    table.replace(values)
+    return values
+
+
+class WriteQueue:
+    """Write-behind queue of value updates to one spreadsheet.
+
+    Writes are held in memory, keyed by range. A later write to the same range replaces the earlier one, and all
+    pending writes are moved to the outbox together as one values.batchUpdate after WRITE_DEBOUNCE_SECONDS without a
+    new write, or when flush() is called. Pending writes must be flushed before any structural change, such as a row
+    delete, is queued, so the requests are sent in the order they were made.
+    """
+
+    def __init__(self, spreadsheet_id: str, value_input_option: str = 'USER_ENTERED'):
+        self.spreadsheet_id = spreadsheet_id
+        self.value_input_option = value_input_option
+        self.__pending: dict[str, list[list]] = {}
+        self.__flush_handle: asyncio.TimerHandle = None
+        _write_queues.append(self)
+
+    @property
+    def pending_count(self):
+        return len(self.__pending)
+
+    def update(self, range_name: str, values: list[list]):
+        # Re-insert so the batch keeps the order of the latest writes
+        self.__pending.pop(range_name, None)
+        self.__pending[range_name] = values
+
+        if self.__flush_handle is not None:
+            self.__flush_handle.cancel()
+        self.__flush_handle = asyncio.get_running_loop().call_later(WRITE_DEBOUNCE_SECONDS, self.__flush)
+
+    async def flush(self):
+        self.__flush()
+
+    def __flush(self):
+        if self.__flush_handle is not None:
+            self.__flush_handle.cancel()
+            self.__flush_handle = None
+
+        if not self.__pending:
+            return
+
+        pending = self.__pending
+        self.__pending = {}
+        enqueue(self.spreadsheet_id, 'values',
+                {'valueInputOption': self.value_input_option,
+                 'data': [{'range': range_name, 'values': values} for range_name, values in pending.items()]})
+
+
+_write_queues: list[WriteQueue] = []
+
+
+def enqueue(spreadsheet_id: str, request_type: str, body: dict):
+    """Queues a request in the outbox and starts sending it in the background.
+
+    Request types:
+    - values: body of a values.batchUpdate
+    - append: values.append, with body {'range': ..., 'valueInputOption': ..., 'values': ...}
+    - spreadsheet: body of a spreadsheets.batchUpdate, e.g. to delete rows
+    """
+    store.outbox.put(spreadsheet_id, request_type, body)
+    _push_in_background()
+
+
+def has_pending_writes():
+    return any(write_queue.pending_count for write_queue in _write_queues) or len(store.outbox) > 0
+
+
+def _outbox_request(spreadsheet_id: str, request_type: str, body: dict):
+    spreadsheets = get_service().spreadsheets()
+    if request_type == 'values':
+        return spreadsheets.values().batchUpdate(spreadsheetId=spreadsheet_id, body=body)
+    elif request_type == 'append':
+        return spreadsheets.values().append(spreadsheetId=spreadsheet_id, range=body['range'],
+                                            valueInputOption=body['valueInputOption'],
+                                            body={'values': body['values']})
+    elif request_type == 'spreadsheet':
+        return spreadsheets.batchUpdate(spreadsheetId=spreadsheet_id, body=body)
+    raise ValueError(f'Unknown request type {request_type}')
+
+
+_push_lock = asyncio.Lock()
+_push_task: asyncio.Task = None
+
+
+async def push():
+    """Sends the requests in the outbox in order. Returns whether the outbox was emptied."""
+    async with _push_lock:
+        while True:
+            entry = store.outbox.peek()
+            if entry is None:
+                return True
+
+            request_id, spreadsheet_id, request_type, body, attempted = entry
+            non_idempotent = request_type in NON_IDEMPOTENT_REQUEST_TYPES
+            if non_idempotent and attempted:
+                # An earlier send failed in a way that leaves it unknown whether Sheets applied it, or the bot stopped
+                # while sending it. It is not sent again, so it can never be applied twice, and is logged to be checked.
+                print(f'Dropped Sheets request {request_type} {body}, it may already have been applied')
+                store.outbox.remove(request_id)
+                continue
+
+            if non_idempotent:
+                store.outbox.set_attempted(request_id, True)
+            try:
+                await execute(_outbox_request(spreadsheet_id, request_type, body))
+            except HttpError as error:
+                if error.resp.status not in (400, 404):
+                    if error.resp.status == 429:
+                        store.outbox.set_attempted(request_id, False)
+                    print(f'Sheets unavailable, {len(store.outbox)} requests left in the outbox: {error}')
+                    return False
+                # The request itself is invalid and would never succeed, so it must not hold up the rest
+                print(f'Dropped Sheets request {request_type} {body}: {error}')
+            except REQUEST_ERRORS as error:
+                if isinstance(error, NOT_SENT_ERRORS):
+                    store.outbox.set_attempted(request_id, False)
+                print(f'Sheets unavailable, {len(store.outbox)} requests left in the outbox: {error}')
+                return False
+            except Exception as error:
+                # e.g. the credentials could not be refreshed, the request is kept to be retried
+                if isinstance(error, NOT_SENT_ERRORS):
+                    store.outbox.set_attempted(request_id, False)
+                print(f'Sheets request {request_type} failed, {len(store.outbox)} requests left in the outbox: '
+                      f'{error!r}')
+                return False
+            store.outbox.remove(request_id)
+
+
+def _push_in_background():
+    global _push_task
+    if _push_task is None or _push_task.done():
+        _push_task = asyncio.create_task(push())
+
+
+async def flush_all():
+    """Flushes every write queue and sends the outbox, e.g. at the end of a command or before shutting down."""
+    for write_queue in _write_queues:
+        await write_queue.flush()
+    await push()
+
+
+_pullers = []
+_pull_tasks: set[asyncio.Task] = set()
+
+
+def register_puller(puller):
+    """Registers a coroutine function that reads a dataset back from Sheets, to pick up edits made there."""
+    _pullers.append(puller)
+
+
+def pull_in_background(puller):
+    """Runs a puller without waiting for it, e.g. to bring data loaded from the local store up to date at startup."""
+
+    async def pull():
+        try:
+            await puller()
+        except Exception as error:
+            print(f'Sheets pull failed: {error!r}')
+
+    task = asyncio.create_task(pull())
+    # Keep a reference until the task is done, so it is not garbage collected
+    _pull_tasks.add(task)
+    task.add_done_callback(_pull_tasks.discard)
+
+
+async def reconcile():
+    """Keeps Sheets and the local store in sync: retries the outbox, and periodically pulls edits made in Sheets.
+
+    Pulls are only made once every local change has been sent, so they never overwrite one. Errors are logged and
+    retried on the next interval, so one bad row or failed credentials refresh never stops the reconciler.
+    """
+    last_pull = time.monotonic()
+    while True:
+        await asyncio.sleep(PUSH_INTERVAL_SECONDS)
+        try:
+            if not await push() or time.monotonic() - last_pull < PULL_INTERVAL_SECONDS:
+                continue
+
+            last_pull = time.monotonic()
+            for puller in _pullers:
+                if has_pending_writes():
+                    break
+                try:
+                    await puller()
+                except Exception as error:
+                    print(f'Sheets pull failed: {error!r}')
+        except Exception as error:
+            print(f'Sheets reconcile failed: {error!r}')
+
+
+def _get_credentials():
+    global _creds
+    with _lock:
+        if _creds is None:
+            _creds = _load_credentials()
+            _schedule_refresh()
+        elif not _creds.valid:
+            _refresh_credentials()
+        return _creds
+
+
+def _load_credentials():
     creds = None
     # The file token.json stores the user's access and refresh tokens, and is
     # created automatically when the authorization flow completes for the first
     # time.
-    if os.path.exists('token.json'):
-        creds = Credentials.from_authorized_user_file('token.json', SCOPES)
+    if os.path.exists(TOKEN_PATH):
+        creds = Credentials.from_authorized_user_file(TOKEN_PATH, SCOPES)
     # If there are no (valid) credentials available, let the user log in.
     if not creds or not creds.valid:
         if creds and creds.expired and creds.refresh_token:
             creds.refresh(Request())
         else:
-            flow = InstalledAppFlow.from_client_secrets_file(
-                'credentials.json', SCOPES)
+            flow = InstalledAppFlow.from_client_secrets_file(CREDENTIALS_PATH, SCOPES)
             creds = flow.run_local_server(port=0)
         # Save the credentials for the next run
-        with open('token.json', 'w') as token:
-            token.write(creds.to_json())
+        _save_credentials(creds)
+    return creds
+
+
+def _save_credentials(creds: Credentials):
+    with open(TOKEN_PATH, 'w') as token:
+        token.write(creds.to_json())
+
+
+def _refresh_credentials():
+    with _lock:
+        _creds.refresh(Request())
+        _save_credentials(_creds)
+        _schedule_refresh()
 
+
+def _schedule_refresh():
+    global _refresh_timer
+    if _refresh_timer is not None:
+        _refresh_timer.cancel()
+    if _creds.expiry is None:
+        # Token does not expire
+        return
+
+    # Credentials.expiry is a naive UTC datetime
+    delay = (_creds.expiry - REFRESH_MARGIN - datetime.utcnow()).total_seconds()
+    _refresh_timer = threading.Timer(max(delay, 0), _background_refresh)
+    _refresh_timer.daemon = True
+    _refresh_timer.start()
+
+
+def _background_refresh():
     try:
-        service = build('sheets', 'v4', credentials=creds)
-        return service
-    except HttpError as err:
-        print(err)
-        return None
+        _refresh_credentials()
+    except Exception as e:
+        # The next request will retry the refresh when it finds the credentials invalid
+        print(f'Sheets credentials refresh failed: {e}')
+
+
+def _get_http():
+    http = getattr(_thread_local, 'http', None)
+    if http is None:
+        # One keep-alive connection pool per thread, reused across requests
+        http = httplib2.Http(timeout=HTTP_TIMEOUT_SECONDS)
+        _thread_local.http = http
+    return http
+
@@ -0,0 +1,107 @@
+import json
+import sqlite3
+import time
+
+STORE_PATH = 'grove.db'
+
+_connection: sqlite3.Connection = None
+
+
+def _get_connection():
+    global _connection
+    if _connection is None:
+        _connection = sqlite3.connect(STORE_PATH)
+        _connection.execute('PRAGMA journal_mode=WAL')
+        _connection.execute('PRAGMA synchronous=NORMAL')
+        _connection.execute('CREATE TABLE IF NOT EXISTS outbox ('
+                            'id INTEGER PRIMARY KEY AUTOINCREMENT, '
+                            'spreadsheet_id TEXT NOT NULL, '
+                            'request_type TEXT NOT NULL, '
+                            'body TEXT NOT NULL, '
+                            'attempted INTEGER NOT NULL DEFAULT 0)')
+        _connection.execute('CREATE TABLE IF NOT EXISTS synced (name TEXT PRIMARY KEY, synced_at REAL NOT NULL)')
+        _connection.commit()
+    return _connection
+
+
+class Table:
+    """Local copy of the rows of one Sheets range.
+
+    Each row is stored with its position in the range and its values. Rows are looked up in the in-memory lists each
+    dataset is loaded into, not here, so there are no indexes on the values.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        # Incremented on every write, so a read from Sheets can tell whether it raced with a local change
+        self.revision = 0
+        self.__created = False
+
+    def __create(self):
+        if self.__created:
+            return
+        connection = _get_connection()
+        connection.execute(f'CREATE TABLE IF NOT EXISTS {self.name} (position INTEGER NOT NULL, value TEXT NOT NULL)')
+        connection.execute(f'CREATE INDEX IF NOT EXISTS {self.name}_position ON {self.name} (position)')
+        connection.commit()
+        self.__created = True
+
+    def load(self) -> list[list[str]]:
+        self.__create()
+        rows = _get_connection().execute(f'SELECT value FROM {self.name} ORDER BY position')
+        return [json.loads(value) for (value,) in rows]
+
+    @property
+    def synced_at(self) -> float:
+        """When the table was last read from Sheets, or None if it never has been."""
+        row = _get_connection().execute('SELECT synced_at FROM synced WHERE name = ?', [self.name]).fetchone()
+        return row[0] if row else None
+
+    def mark_synced(self):
+        connection = _get_connection()
+        with connection:
+            connection.execute('INSERT OR REPLACE INTO synced VALUES (?, ?)', [self.name, time.time()])
+
+    def replace(self, values: list[list[str]]):
+        self.__create()
+        connection = _get_connection()
+        with connection:
+            connection.execute(f'DELETE FROM {self.name}')
+            connection.executemany(f'INSERT INTO {self.name} (position, value) VALUES (?, ?)',
+                                   [(position, json.dumps(value)) for position, value in enumerate(values)])
+        self.revision += 1
+
+
+class Outbox:
+    """Requests waiting to be sent to Sheets, in the order they were made."""
+
+    def __len__(self):
+        return _get_connection().execute('SELECT COUNT(*) FROM outbox').fetchone()[0]
+
+    def put(self, spreadsheet_id: str, request_type: str, body: dict):
+        connection = _get_connection()
+        with connection:
+            connection.execute('INSERT INTO outbox (spreadsheet_id, request_type, body) VALUES (?, ?, ?)',
+                               [spreadsheet_id, request_type, json.dumps(body)])
+
+    def peek(self):
+        row = _get_connection().execute(
+            'SELECT id, spreadsheet_id, request_type, body, attempted FROM outbox ORDER BY id LIMIT 1').fetchone()
+        if row is None:
+            return None
+        request_id, spreadsheet_id, request_type, body, attempted = row
+        return request_id, spreadsheet_id, request_type, json.loads(body), bool(attempted)
+
+    def set_attempted(self, request_id: int, attempted: bool):
+        """Marks a request as possibly applied by Sheets, from just before it is sent until it is known not to be."""
+        connection = _get_connection()
+        with connection:
+            connection.execute('UPDATE outbox SET attempted = ? WHERE id = ?', [int(attempted), request_id])
+
+    def remove(self, request_id: int):
+        connection = _get_connection()
+        with connection:
+            connection.execute('DELETE FROM outbox WHERE id = ?', [request_id])
+
+
+outbox = Outbox()